@@ -0,0 +1,98 @@
+"""
+Compare the programacion parser against a full-page BeautifulSoup parse.
+
+Run from backend/:
+
+    python -m benchmarks.bench_concert_parser [--repeat N]
+
+The fixtures are saved OnSevilla venue pages. For each one the events of both
+parsers must be identical; then their time per page and peak memory are
+reported.
+"""
+import argparse
+import glob
+import os
+import time
+import tracemalloc
+from typing import Callable, List
+from bs4 import BeautifulSoup
+from routers.concerts import parse_programacion
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+SPANISH_MONTHS = [
+    "enero", "febrero", "marzo", "abril", "mayo", "junio",
+    "julio", "agosto", "septiembre", "octubre", "noviembre", "diciembre"
+]
+
+
+def parse_full_page(content: bytes) -> List[dict]:
+    """The previous parser: the whole page as a BeautifulSoup tree"""
+    soup = BeautifulSoup(content, "html.parser")
+    programacion_anchor = soup.find("a", {"name": "programacion"})
+    parent_container = programacion_anchor.parent
+    events = []
+    for element in parent_container.descendants:
+        if element.name == "strong":
+            text = element.get_text(strip=True)
+            if any(month in text.lower() for month in SPANISH_MONTHS):
+                current_date = text
+                next_sibling = element.next_sibling
+                attempts = 0
+                while next_sibling and attempts < 10:
+                    if isinstance(next_sibling, str):
+                        desc = next_sibling.strip()
+                        if desc.startswith("·"):
+                            desc = desc[1:].strip()
+                            if desc:
+                                events.append({"date": current_date, "description": desc})
+                                break
+                    elif next_sibling.name == "strong":
+                        break
+                    next_sibling = next_sibling.next_sibling
+                    attempts += 1
+    return events
+
+
+def measure(parse: Callable[[bytes], List[dict]], content: bytes, repeat: int):
+    """Return (milliseconds per parse, peak traced memory in KiB)"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        parse(content)
+    elapsed = (time.perf_counter() - started) / repeat
+
+    tracemalloc.start()
+    parse(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed * 1000, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20, help="Parses per fixture and parser")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html")))
+    if not paths:
+        raise SystemExit(f"No fixtures found in {FIXTURES_DIR}")
+
+    print(f"{'fixture':<28} {'events':>6} {'full ms':>9} {'fast ms':>9} {'speedup':>8} {'full KiB':>9} {'fast KiB':>9}")
+    for path in paths:
+        with open(path, "rb") as f:
+            content = f.read()
+        expected = parse_full_page(content)
+        events = parse_programacion(content)
+        if events != expected:
+            raise SystemExit(f"{os.path.basename(path)}: parsers disagree ({len(events)} vs {len(expected)} events)")
+
+        full_ms, full_kib = measure(parse_full_page, content, args.repeat)
+        fast_ms, fast_kib = measure(parse_programacion, content, args.repeat)
+        print(
+            f"{os.path.basename(path):<28} {len(events):>6} {full_ms:>9.1f} {fast_ms:>9.1f} "
+            f"{full_ms / fast_ms:>7.1f}x {full_kib:>9.0f} {fast_kib:>9.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Load-test the backend against stand-in upstreams.
+
+Run from backend/:
+
+    python -m benchmarks.bench_endpoints [--concurrency 10] [--requests 200]
+        [--latency 0.05] [--output results.json] [--compare baseline.json]
+
+The backend runs in its own uvicorn process, with a fresh cache and pointed
+at the fake AEMET, Guardian and OnSevilla servers from fake_upstreams. Once
+the startup refresh has warmed the caches, three scenarios are run, each
+endpoint driven by `--concurrency` clients for `--requests` requests:
+
+- cold: every request asks for a municipio or search not cached yet
+- warm: the dashboard endpoints, served from the cache
+- upstream_failure: upstreams answer 503; cached endpoints must stay fast,
+  uncached ones must fail fast once the circuit breakers open
+
+Throughput and p50/p95/p99 latencies are printed and written as JSON. With
+`--compare`, p95 latencies are checked against an earlier run and the exit
+status is 1 if any got worse by more than `--tolerance`.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+import httpx
+from benchmarks.fake_upstreams import FakeUpstreams, FaultConfig
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+# Endpoints per scenario, as functions of the request number so cold requests can use fresh keys
+WARM_ENDPOINTS: Dict[str, Callable[[int], str]] = {
+    "/weather": lambda n: "/weather",
+    "/weather/current": lambda n: "/weather/current",
+    "/weather/daily": lambda n: "/weather/daily",
+    "/concerts": lambda n: "/concerts",
+    "/news": lambda n: "/news?section=culture&page_size=15",
+    "/news/batch": lambda n: "/news/batch",
+    "/dashboard": lambda n: "/dashboard",
+}
+COLD_ENDPOINTS: Dict[str, Callable[[int], str]] = {
+    "/weather/current (new municipio)": lambda n: f"/weather/current?municipio={10000 + n:05d}",
+    "/news (new search)": lambda n: f"/news?query=benchmark{n}",
+}
+# Served from the cache while upstreams fail, next to requests that need an upstream
+FAILURE_ENDPOINTS: Dict[str, Callable[[int], str]] = {
+    "/weather/current": WARM_ENDPOINTS["/weather/current"],
+    "/dashboard": WARM_ENDPOINTS["/dashboard"],
+    "/weather/current (new municipio)": lambda n: f"/weather/current?municipio={60000 + n:05d}",
+    "/news (new search)": lambda n: f"/news?query=failing{n}",
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(fraction * len(sorted_values) + 0.5))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+async def drive(client: httpx.AsyncClient, path_for: Callable[[int], str], requests: int, concurrency: int) -> dict:
+    """Send `requests` requests from `concurrency` concurrent clients and summarize them"""
+    counter = itertools.count()
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while (n := next(counter)) < requests:
+            started = time.perf_counter()
+            try:
+                response = await client.get(path_for(n))
+                failed = response.status_code >= 500
+            except httpx.HTTPError:
+                failed = True
+            latencies.append(time.perf_counter() - started)
+            errors += failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+async def run_scenario(base_url: str, endpoints: Dict[str, Callable[[int], str]], args) -> Dict[str, dict]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    results = {}
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        for name, path_for in endpoints.items():
+            results[name] = await drive(client, path_for, args.requests, args.concurrency)
+    return results
+
+
+def wait_until_ready(base_url: str, timeout: float = 60):
+    """Wait for the backend to answer and its startup refresh to have warmed the caches"""
+    deadline = time.monotonic() + timeout
+    pending = [path_for(0) for path_for in WARM_ENDPOINTS.values()]
+    while pending:
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"Backend not ready, still failing: {', '.join(pending)}")
+        try:
+            if httpx.get(base_url + pending[0], timeout=5).status_code == 200:
+                pending.pop(0)
+                continue
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+
+
+def print_results(scenario: str, results: Dict[str, dict]):
+    print(f"\n{scenario}")
+    print(f"  {'endpoint':<36} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for name, stats in results.items():
+        print(
+            f"  {name:<36} {stats['rps']:>8} {stats['p50_ms']:>8} {stats['p95_ms']:>8} "
+            f"{stats['p99_ms']:>8} {stats['errors']:>7}"
+        )
+
+
+def compare(report: dict, baseline_path: str, tolerance: float) -> bool:
+    """Print p95 changes against a baseline, returning False on a regression"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    ok = True
+    print(f"\np95 against {baseline_path} (tolerance {tolerance:.0%})")
+    for scenario, results in report["scenarios"].items():
+        for name, stats in results.items():
+            before = baseline.get("scenarios", {}).get(scenario, {}).get(name)
+            if not before or not before["p95_ms"]:
+                continue
+            change = stats["p95_ms"] / before["p95_ms"] - 1
+            regressed = change > tolerance
+            ok = ok and not regressed
+            print(f"  {scenario:<17} {name:<36} {before['p95_ms']:>8} -> {stats['p95_ms']:>8} ms "
+                  f"({change:+.0%}){'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent clients per endpoint")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint and scenario")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds each upstream response is delayed")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Up to this many extra seconds of upstream delay")
+    parser.add_argument("--output", help="Where to write the JSON results (default: benchmarks/results/<time>.json)")
+    parser.add_argument("--compare", help="Earlier results to compare p95 latencies against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 increase before failing --compare")
+    args = parser.parse_args()
+
+    config = FaultConfig(latency=args.latency, jitter=args.jitter)
+    upstreams = FakeUpstreams(config)
+    upstreams.start()
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = {
+        **os.environ,
+        **upstreams.backend_env(),
+        # Fresh in-memory caches only, no forecast archive, and no quotas beyond what the fake latency adds
+        "CACHE_DB_PATH": "",
+        "ARCHIVE_DB_PATH": "",
+        "AEMET_RATE_PER_MINUTE": "0",
+        "GUARDIAN_RATE_PER_MINUTE": "0",
+        "AEMET_DAILY_QUOTA": "0",
+        "GUARDIAN_DAILY_QUOTA": "0",
+        "WEATHER_MAX_MUNICIPIOS": str(max(32, args.requests)),
+    }
+    backend: Optional[subprocess.Popen] = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    report = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "upstream_latency": args.latency,
+            "upstream_jitter": args.jitter,
+        },
+        "scenarios": {},
+    }
+    try:
+        wait_until_ready(base_url)
+        for scenario, endpoints, failure_rate in [
+            ("cold", COLD_ENDPOINTS, 0.0),
+            ("warm", WARM_ENDPOINTS, 0.0),
+            ("upstream_failure", FAILURE_ENDPOINTS, 1.0),
+        ]:
+            config.failure_rate = failure_rate
+            results = asyncio.run(run_scenario(base_url, endpoints, args))
+            report["scenarios"][scenario] = results
+            print_results(scenario, results)
+    finally:
+        backend.terminate()
+        backend.wait()
+        upstreams.stop()
+
+    output = args.output or os.path.join(RESULTS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare and not compare(report, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Stand-in AEMET, Guardian and OnSevilla servers serving the recorded fixtures.
+
+One Starlette app serves all three under /aemet, /guardian and /onsevilla,
+each upstream on a port of its own so per-host limits (connections, quotas)
+apply to them separately as they would in production. The backend is pointed
+at it with AEMET_BASE_URL, GUARDIAN_BASE_URL and CONCERT_VENUES. Forecast,
+article and concert dates are moved to today, so "current" and "upcoming"
+lookups keep working whenever the fixtures were recorded.
+
+Latency and failures can be injected, and changed while the server runs,
+through the FaultConfig passed to create_app.
+"""
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import random
+import re
+import socket
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+VENUE_PAGES = {
+    "programacion-sala-x-sevilla": "onsevilla_sala_x.html",
+    "programacion-sala-even-sevilla": "onsevilla_sala_even.html",
+}
+
+
+class FaultConfig:
+    """Injected behaviour, read on every request so it can be changed between scenarios"""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0):
+        self.latency = latency  # Seconds added to every response
+        self.jitter = jitter  # Up to this many extra seconds, uniformly random
+        self.failure_rate = failure_rate  # Share of requests answered with a 503
+        self.requests = 0
+
+
+def _load_json(name: str):
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _shift_days(forecast: list) -> list:
+    """Move the forecast days to start today"""
+    forecast = copy.deepcopy(forecast)
+    for offset, day in enumerate(forecast[0]["prediccion"]["dia"]):
+        day["fecha"] = (date.today() + timedelta(days=offset)).isoformat() + "T00:00:00"
+    return forecast
+
+
+def _shift_articles(search: dict) -> dict:
+    """Make the articles a few minutes to a few hours old"""
+    search = copy.deepcopy(search)
+    now = datetime.now(timezone.utc)
+    for index, article in enumerate(search["response"]["results"]):
+        published = now - timedelta(minutes=20 * (index + 1))
+        article["webPublicationDate"] = published.strftime("%Y-%m-%dT%H:%M:%SZ")
+    return search
+
+
+SPANISH_MONTHS = [
+    "enero", "febrero", "marzo", "abril", "mayo", "junio",
+    "julio", "agosto", "septiembre", "octubre", "noviembre", "diciembre"
+]
+_CONCERT_DATE = re.compile(r"<strong>([^<\d]*?)(\d{1,2}) (" + "|".join(SPANISH_MONTHS) + r") (\d{4})</strong>")
+
+
+def _shift_concerts(pages: Dict[str, bytes]) -> Dict[str, bytes]:
+    """
+    Move the listed concert dates by whole weeks, so the earliest one falls in
+    the past week and the weekday names stay right.
+    """
+    texts = {slug: content.decode("utf-8") for slug, content in pages.items()}
+    listed = [
+        date(int(year), SPANISH_MONTHS.index(month) + 1, int(day))
+        for text in texts.values()
+        for _, day, month, year in _CONCERT_DATE.findall(text)
+    ]
+    if not listed:
+        return pages
+    shift = timedelta(weeks=(date.today() - min(listed)).days // 7)
+
+    def shifted(match: re.Match) -> str:
+        weekday, day, month, year = match.groups()
+        moved = date(int(year), SPANISH_MONTHS.index(month) + 1, int(day)) + shift
+        return f"<strong>{weekday}{moved.day} {SPANISH_MONTHS[moved.month - 1]} {moved.year}</strong>"
+
+    return {slug: _CONCERT_DATE.sub(shifted, text).encode("utf-8") for slug, text in texts.items()}
+
+
+def create_app(config: FaultConfig) -> Starlette:
+    forecasts = {
+        "horaria": _shift_days(_load_json("aemet_horaria.json")),
+        "diaria": _shift_days(_load_json("aemet_diaria.json")),
+    }
+    search = _shift_articles(_load_json("guardian_search.json"))
+    pages = {}
+    for slug, name in VENUE_PAGES.items():
+        with open(os.path.join(FIXTURES_DIR, name), "rb") as f:
+            pages[slug] = f.read()
+    pages = _shift_concerts(pages)
+
+    async def inject():
+        """Returns a 503 response when this request should fail"""
+        config.requests += 1
+        delay = config.latency + random.uniform(0, config.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        if config.failure_rate and random.random() < config.failure_rate:
+            return JSONResponse({"error": "injected failure"}, status_code=503)
+        return None
+
+    async def aemet_metadata(request: Request):
+        failure = await inject()
+        if failure:
+            return failure
+        kind, municipio = request.path_params["kind"], request.path_params["municipio"]
+        return JSONResponse({
+            "descripcion": "exito",
+            "estado": 200,
+            "datos": str(request.url_for("aemet_datos", kind=kind, municipio=municipio)),
+        })
+
+    async def aemet_datos(request: Request):
+        failure = await inject()
+        if failure:
+            return failure
+        return JSONResponse(forecasts[request.path_params["kind"]])
+
+    async def guardian_search(request: Request):
+        failure = await inject()
+        if failure:
+            return failure
+        params = request.query_params
+        page_size = int(params.get("page-size", 10))
+        page = int(params.get("page", 1))
+        section = params.get("section") or params.get("q") or "world"
+        results = [
+            {**article, "id": f"{section}/{article['id']}", "sectionId": section, "sectionName": section.title()}
+            for article in search["response"]["results"]
+        ]
+        total = len(results)
+        return JSONResponse({"response": {
+            **search["response"],
+            "total": total,
+            "pageSize": page_size,
+            "currentPage": page,
+            "pages": max(1, -(-total // page_size)),
+            "results": results[(page - 1) * page_size:page * page_size],
+        }})
+
+    async def venue_page(request: Request):
+        failure = await inject()
+        if failure:
+            return failure
+        content = pages.get(request.path_params["slug"])
+        if content is None:
+            return Response(status_code=404)
+        etag = f'"{hashlib.blake2b(content, digest_size=8).hexdigest()}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(content, media_type="text/html; charset=UTF-8", headers={"ETag": etag})
+
+    return Starlette(routes=[
+        Route("/aemet/prediccion/especifica/municipio/{kind}/{municipio}", aemet_metadata),
+        Route("/aemet/datos/{kind}/{municipio}", aemet_datos, name="aemet_datos"),
+        Route("/guardian/search", guardian_search),
+        Route("/onsevilla/{slug}", venue_page),
+    ])
+
+
+UPSTREAMS = ["aemet", "guardian", "onsevilla"]
+
+
+class FakeUpstreams:
+    """Runs the stand-in servers on a background thread, one free port per upstream"""
+
+    def __init__(self, config: FaultConfig):
+        self.config = config
+        self._sockets = []
+        self.base_urls: Dict[str, str] = {}
+        for upstream in UPSTREAMS:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind(("127.0.0.1", 0))
+            self._sockets.append(sock)
+            self.base_urls[upstream] = f"http://127.0.0.1:{sock.getsockname()[1]}/{upstream}"
+        self._server = uvicorn.Server(uvicorn.Config(create_app(config), log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, kwargs={"sockets": self._sockets}, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Fake upstreams did not start")
+            time.sleep(0.05)
+
+    def stop(self):
+        self._server.should_exit = True
+        self._thread.join()
+        for sock in self._sockets:
+            sock.close()
+
+    def backend_env(self) -> dict:
+        """Environment pointing the backend at these servers"""
+        venues: List[dict] = [
+            {"name": name.removesuffix(".html"), "url": f"{self.base_urls['onsevilla']}/{slug}"}
+            for slug, name in VENUE_PAGES.items()
+        ]
+        return {
+            "AEMET_BASE_URL": self.base_urls["aemet"],
+            "GUARDIAN_BASE_URL": self.base_urls["guardian"],
+            "CONCERT_VENUES": json.dumps(venues),
+            "WEATHER_KEY": "benchmark",
+            "GUARDIAN_API_KEY": "benchmark",
+        }
@@ -0,0 +1,367 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import zlib
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+_backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Where past forecasts are kept. Set to an empty string to disable.
+ARCHIVE_DB_PATH = os.getenv("ARCHIVE_DB_PATH", os.path.join(_backend_dir, "data", "archive.sqlite3"))
+# Forecasts issued longer ago than this are deleted
+RETENTION = timedelta(days=int(os.getenv("ARCHIVE_RETENTION_DAYS", 365)))
+# Decoded snapshots kept in memory, they never change once written
+DECODED_CACHE_SIZE = 256
+
+# Numbers are stored as int16 tenths, this marks a missing value
+_MISSING = -32768
+# Text values are stored as uint8 indexes into the snapshot's dictionary, this marks a missing value
+_MISSING_TEXT = 255
+# Times are naive local time (like AEMET's), counted from this origin
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _hours(moment: datetime) -> int:
+    return int((moment - _EPOCH).total_seconds() // 3600)
+
+
+def _seconds(moment: datetime) -> int:
+    return int((moment - _EPOCH).total_seconds())
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+class ArchivedSnapshot:
+    """One archived forecast: its issue time and a column of values per field, aligned with `targets`"""
+
+    __slots__ = ("issued_at", "targets", "columns")
+
+    def __init__(self, issued_at: int, targets: List[int], columns: Dict[str, list]):
+        self.issued_at = issued_at  # Seconds since _EPOCH
+        self.targets = targets  # Hours since _EPOCH
+        self.columns = columns
+
+    @property
+    def issued(self) -> datetime:
+        return _EPOCH + timedelta(seconds=self.issued_at)
+
+
+def _encode(targets: List[int], columns: Dict[str, list]) -> bytes:
+    """
+    Pack a snapshot column by column: target hours as uint16 offsets from the
+    first one, numbers as int16 tenths, text as uint8 dictionary indexes.
+    The columns compress far better than the JSON they come from.
+    """
+    first = targets[0]
+    header: Dict[str, Any] = {"first": first, "n": len(targets), "columns": [], "dicts": {}}
+    parts = [_little_endian(array("H", [target - first for target in targets]))]
+    for name, values in columns.items():
+        if any(isinstance(value, str) for value in values):
+            words = sorted({str(value) for value in values if value is not None})[:_MISSING_TEXT]
+            index = {word: position for position, word in enumerate(words)}
+            codes = [index.get(str(value), _MISSING_TEXT) if value is not None else _MISSING_TEXT for value in values]
+            parts.append(array("B", codes).tobytes())
+            header["columns"].append([name, "text"])
+            header["dicts"][name] = words
+        else:
+            tenths = []
+            for value in values:
+                scaled = _MISSING if value is None else round(value * 10)
+                tenths.append(scaled if _MISSING < scaled <= 32767 else _MISSING)
+            parts.append(_little_endian(array("h", tenths)))
+            header["columns"].append([name, "tenths"])
+    data = json.dumps(header, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return zlib.compress(data + b"\n" + b"".join(parts), 9)
+
+
+def _decode(issued_at: int, blob: bytes) -> ArchivedSnapshot:
+    data = zlib.decompress(blob)
+    newline = data.index(b"\n")
+    header = json.loads(data[:newline])
+    n = header["n"]
+    position = newline + 1
+    offsets = _from_little_endian("H", data[position:position + 2 * n])
+    position += 2 * n
+    columns: Dict[str, list] = {}
+    for name, kind in header["columns"]:
+        if kind == "text":
+            words = header["dicts"][name]
+            codes = data[position:position + n]
+            position += n
+            columns[name] = [words[code] if code != _MISSING_TEXT else None for code in codes]
+        else:
+            tenths = _from_little_endian("h", data[position:position + 2 * n])
+            position += 2 * n
+            columns[name] = [value / 10 if value != _MISSING else None for value in tenths]
+    first = header["first"]
+    return ArchivedSnapshot(issued_at, [first + offset for offset in offsets], columns)
+
+
+def _bucket_means(values: Dict[int, float], start: int, end: int, step: int) -> Dict[int, float]:
+    """Average the values of each `step`-hour bucket between `start` and `end` (hours), keyed by bucket start"""
+    sums: Dict[int, List[float]] = {}
+    for target, value in values.items():
+        if start <= target <= end:
+            bucket = start + (target - start) // step * step
+            sums.setdefault(bucket, []).append(value)
+    return {bucket: round(sum(bucket_values) / len(bucket_values), 1) for bucket, bucket_values in sums.items()}
+
+
+class ForecastArchive:
+    """
+    Append-only SQLite (WAL mode) archive of forecast snapshots.
+
+    One row per forecast issued, keyed by series (e.g. "horaria"), location
+    and issue time, with the first and last hour it covers so range queries
+    only read the rows they need. The forecast itself is one compressed
+    columnar blob (see _encode), around 1KB for three days of hourly data,
+    so years of forecasts stay a few MB on the Pi's SD card.
+    """
+
+    def __init__(self, path: str, retention: timedelta = RETENTION):
+        self.path = path
+        self.retention = retention
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._decoded: "OrderedDict[Tuple[str, str, int], ArchivedSnapshot]" = OrderedDict()
+        self._pruned_on: Optional[str] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    series TEXT NOT NULL,
+                    location TEXT NOT NULL,
+                    issued_at INTEGER NOT NULL,
+                    first_target INTEGER NOT NULL,
+                    last_target INTEGER NOT NULL,
+                    data BLOB NOT NULL,
+                    PRIMARY KEY (series, location, issued_at)
+                ) WITHOUT ROWID
+                """
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def append(self, series: str, location: str, issued_at: datetime, rows: Dict[datetime, Dict[str, Any]]) -> bool:
+        """
+        Archive a forecast. A forecast already archived with the same issue
+        time (refetched before the upstream issued a new one) is skipped.
+
+        Args:
+            series: What kind of forecast this is, e.g. "horaria"
+            location: Where it is for, e.g. a municipio code
+            issued_at: When the upstream issued it
+            rows: Field values (numbers or short text) per target hour
+
+        Returns:
+            Whether a new snapshot was written
+        """
+        if not self.enabled or not rows:
+            return False
+        by_hour = sorted((_hours(target), values) for target, values in rows.items())
+        targets = [target for target, _ in by_hour]
+        if targets[-1] - targets[0] > 65535:
+            raise ValueError("A snapshot cannot span more than 65535 hours")
+        fields = list(dict.fromkeys(field for _, values in by_hour for field in values))
+        columns = {field: [values.get(field) for _, values in by_hour] for field in fields}
+        blob = _encode(targets, columns)
+        try:
+            with self._lock:
+                conn = self._connect()
+                written = conn.execute(
+                    "INSERT OR IGNORE INTO snapshots (series, location, issued_at, first_target, last_target, data) VALUES (?, ?, ?, ?, ?, ?)",
+                    (series, location, _seconds(issued_at), targets[0], targets[-1], blob),
+                ).rowcount
+                self._prune(conn)
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"Error writing forecast archive: {e}")
+            return False
+        return bool(written)
+
+    def _prune(self, conn: sqlite3.Connection):
+        # Once a day is plenty, the table grows by a few rows per refresh
+        today = datetime.now().strftime("%Y-%m-%d")
+        if self._pruned_on == today:
+            return
+        self._pruned_on = today
+        conn.execute("DELETE FROM snapshots WHERE issued_at < ?", (_seconds(datetime.now() - self.retention),))
+
+    def snapshots(
+        self,
+        series: str,
+        location: str,
+        issued_from: datetime,
+        issued_to: datetime,
+        min_target: Optional[datetime] = None,
+        limit: Optional[int] = None,
+    ) -> List[ArchivedSnapshot]:
+        """
+        The forecasts issued between `issued_from` and `issued_to`, oldest first.
+
+        Args:
+            series: Series name given to append()
+            location: Location given to append()
+            issued_from: Earliest issue time
+            issued_to: Latest issue time
+            min_target: Leave out forecasts that end before this hour
+            limit: Only the most recent `limit` forecasts
+        """
+        if not self.enabled:
+            return []
+        query = "SELECT issued_at FROM snapshots WHERE series = ? AND location = ? AND issued_at BETWEEN ? AND ?"
+        params: list = [series, location, _seconds(issued_from), _seconds(issued_to)]
+        if min_target is not None:
+            query += " AND last_target >= ?"
+            params.append(_hours(min_target))
+        query += " ORDER BY issued_at DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        found = []
+        # One lock for the lookup and the decoding, so a cached snapshot cannot be evicted in between
+        with self._lock:
+            try:
+                conn = self._connect()
+                issued = [row[0] for row in conn.execute(query, params)]
+                for issued_at in reversed(issued):
+                    key = (series, location, issued_at)
+                    snapshot = self._decoded.get(key)
+                    if snapshot is None:
+                        data = conn.execute(
+                            "SELECT data FROM snapshots WHERE series = ? AND location = ? AND issued_at = ?",
+                            (series, location, issued_at),
+                        ).fetchone()[0]
+                        snapshot = self._decoded[key] = _decode(issued_at, data)
+                    self._decoded.move_to_end(key)
+                    found.append(snapshot)
+            except sqlite3.Error as e:
+                print(f"Error reading forecast archive: {e}")
+                return []
+            while len(self._decoded) > DECODED_CACHE_SIZE:
+                self._decoded.popitem(last=False)
+        return found
+
+    def trend(
+        self,
+        series: str,
+        location: str,
+        field: str,
+        start: datetime,
+        end: datetime,
+        lead: timedelta,
+        period: timedelta = timedelta(hours=1),
+        step: int = 1,
+        horizon: timedelta = timedelta(days=8),
+    ) -> List[Tuple[datetime, Optional[float], Optional[float]]]:
+        """
+        Compare, hour by hour, the last forecast made for a target with the
+        one issued at least `lead` before it.
+
+        The last forecast issued before a target's `period` ends is as close
+        to an observation as the archive gets, so it stands in for the
+        observed value.
+
+        Args:
+            series: Series name given to append()
+            location: Location given to append()
+            field: A numeric field of the series
+            start: First target hour
+            end: Last target hour
+            lead: How far ahead the compared forecast was issued
+            period: How long each target of the series lasts (1 hour, 1 day)
+            step: Hours averaged into each returned point
+            horizon: How far ahead the series forecasts, bounds the rows read
+
+        Returns:
+            (time, observed, forecast) per `step`-hour bucket with data, in order
+        """
+        snapshots = self.snapshots(series, location, start - horizon - lead, end + period, min_target=start)
+        first, last = _hours(start), _hours(end)
+        period_seconds = int(period.total_seconds())
+        lead_seconds = int(lead.total_seconds())
+        observed: Dict[int, float] = {}
+        forecast: Dict[int, float] = {}
+        # Oldest first, so each target ends up with the latest qualifying forecast
+        for snapshot in snapshots:
+            values = snapshot.columns.get(field)
+            if values is None:
+                continue
+            for target, value in zip(snapshot.targets, values):
+                if value is None or isinstance(value, str) or not first <= target <= last:
+                    continue
+                target_seconds = target * 3600
+                if snapshot.issued_at < target_seconds + period_seconds:
+                    observed[target] = value
+                if snapshot.issued_at <= target_seconds - lead_seconds:
+                    forecast[target] = value
+
+        observed_means = _bucket_means(observed, first, last, step)
+        forecast_means = _bucket_means(forecast, first, last, step)
+        return [
+            (_EPOCH + timedelta(hours=bucket), observed_means.get(bucket), forecast_means.get(bucket))
+            for bucket in sorted(observed_means.keys() | forecast_means.keys())
+        ]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def downsample(snapshot: ArchivedSnapshot, field: str, step: int) -> Tuple[datetime, List[Optional[Any]]]:
+    """
+    One field of a snapshot as a regular series from its first target hour,
+    numbers averaged over `step` hours, text taken from each bucket's first hour.
+
+    Returns:
+        (start, values) with one value per `step` hours, None where there is no data
+    """
+    values = snapshot.columns.get(field, [])
+    first = snapshot.targets[0]
+    buckets: List[list] = [[] for _ in range((snapshot.targets[-1] - first) // step + 1)]
+    for target, value in zip(snapshot.targets, values):
+        if value is not None:
+            buckets[(target - first) // step].append(value)
+    series = []
+    for bucket in buckets:
+        if not bucket:
+            series.append(None)
+        elif isinstance(bucket[0], str):
+            series.append(bucket[0])
+        else:
+            series.append(round(sum(bucket) / len(bucket), 1))
+    return _EPOCH + timedelta(hours=first), series
+
+
+archive = ForecastArchive(ARCHIVE_DB_PATH)
@@ -0,0 +1,420 @@
+import asyncio
+import os
+import sys
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from functools import update_wrapper
+from typing import Any, Awaitable, Callable, Hashable, List, Optional, Tuple
+from cachetools.keys import hashkey
+from fastapi import Response
+from core.events import feed
+from core.metrics import CACHE_EVICTIONS, CACHE_REQUESTS
+from core.store import LEASE_SECONDS, WORKERS, store
+
+# How long past its TTL an entry may still be served while upstream is slow or failing
+MAX_STALE = timedelta(seconds=int(os.getenv("CACHE_MAX_STALE_SECONDS", 6 * 3600)))
+# How long a failed fetch is remembered before upstream is tried again
+ERROR_TTL = timedelta(seconds=int(os.getenv("CACHE_ERROR_TTL_SECONDS", 60)))
+# Memory all caches of all workers together may hold, keep well under the container's mem_limit.
+# Each worker keeps its own copy of what it serves, so each gets an even share
+MAX_BYTES = int(os.getenv("CACHE_MAX_MB", 128)) * 1024 * 1024 // WORKERS
+# How often a worker waiting on another worker's refresh checks for its result
+LEASE_POLL_INTERVAL = 0.25
+# How often each cache deletes its stored entries that are too old to be served
+PRUNE_INTERVAL = 3600
+
+
+class CacheEntry:
+    """A cached value together with the time it was fetched and its estimated size"""
+
+    __slots__ = ("value", "fetched_at", "size", "last_used")
+
+    def __init__(self, value: Any, fetched_at: float, size: int = 0):
+        self.value = value
+        self.fetched_at = fetched_at
+        self.size = size
+        self.last_used = time.time()
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+
+class CacheResult:
+    """What a lookup returned, and whether it is past its TTL"""
+
+    __slots__ = ("value", "age", "stale", "fetched_at")
+
+    def __init__(self, value: Any, age: float, stale: bool, fetched_at: float):
+        self.value = value
+        self.age = age
+        self.stale = stale
+        # Changes whenever the value is refetched, usable as a version
+        self.fetched_at = fetched_at
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Approximate memory held by a JSON-like value (dicts, lists, strings,
+    numbers), or by objects made of them (pydantic models, __slots__ classes)
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(key) + estimate_size(item) for key, item in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(estimate_size(item) for item in value)
+    elif hasattr(value, "__dict__"):
+        size += estimate_size(value.__dict__)
+    elif hasattr(type(value), "__slots__"):
+        size += sum(estimate_size(getattr(value, name, None)) for name in type(value).__slots__)
+    return size
+
+
+class CacheBudget:
+    """
+    One memory budget shared by every StaleCache and DerivedCache.
+
+    When the caches together hold more than `max_bytes`, entries are evicted
+    across caches, least recently used first. Entries of a cache that is
+    costly to refetch (rate-limited or scraped upstreams) count as used
+    `refetch_cost` more recently than they were, so cheap search results go
+    first.
+    """
+
+    def __init__(self, max_bytes: int = MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.used = 0
+        self.caches: List["BudgetedCache"] = []
+
+    def register(self, cache: "BudgetedCache"):
+        self.caches.append(cache)
+
+    def enforce(self, keep: Tuple["BudgetedCache", Hashable]):
+        """Evict entries until the budget is met, never the entry `keep` just stored"""
+        while self.used > self.max_bytes:
+            victim = None
+            victim_priority = None
+            for cache in self.caches:
+                oldest = cache.oldest()
+                if oldest is None or (cache, oldest[0]) == keep:
+                    continue
+                priority = oldest[1].last_used + cache.refetch_cost
+                if victim_priority is None or priority < victim_priority:
+                    victim, victim_priority = cache, priority
+            if victim is None:
+                # Only the new entry is left, it is larger than the budget on its own
+                return
+            victim.evict_oldest()
+
+
+budget = CacheBudget()
+
+
+class BudgetedCache:
+    """Entries kept least recently used first and charged to the shared memory budget"""
+
+    def __init__(self, name: str, maxsize: int = 1024, refetch_cost: timedelta = timedelta(0)):
+        self.name = name
+        self.maxsize = maxsize
+        self.refetch_cost = refetch_cost.total_seconds()
+        self.entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self.bytes = 0
+        budget.register(self)
+
+    def set(self, key: Hashable, value: Any, fetched_at: Optional[float] = None) -> CacheEntry:
+        self._remove(key)
+        entry = self.entries[key] = CacheEntry(value, fetched_at or time.time(), estimate_size(value))
+        self.bytes += entry.size
+        budget.used += entry.size
+        while len(self.entries) > self.maxsize:
+            self.evict_oldest()
+        budget.enforce(keep=(self, key))
+        return entry
+
+    def oldest(self) -> Optional[Tuple[Hashable, CacheEntry]]:
+        """The least recently used (key, entry), if any"""
+        for key, entry in self.entries.items():
+            return key, entry
+        return None
+
+    def evict_oldest(self):
+        key, entry = self.entries.popitem(last=False)
+        self.bytes -= entry.size
+        budget.used -= entry.size
+        CACHE_EVICTIONS.inc(self.name)
+
+    def clear(self):
+        budget.used -= self.bytes
+        self.bytes = 0
+        self.entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "entries": len(self.entries),
+            "maxsize": self.maxsize,
+            "bytes": self.bytes,
+            "refetch_cost": self.refetch_cost,
+        }
+
+    def _remove(self, key: Hashable):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+            budget.used -= entry.size
+
+
+class DerivedCache(BudgetedCache):
+    """
+    Values derived from cached data (lookup tables, serialized responses,
+    scraper state), under the same memory budget as the data. Anything
+    evicted can be rebuilt without an upstream call.
+    """
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self.entries.get(key)
+        if entry is None:
+            return default
+        entry.last_used = time.time()
+        self.entries.move_to_end(key)
+        return entry.value
+
+
+class StaleCache(BudgetedCache):
+    """
+    TTL cache that prefers serving an old value over failing.
+
+    - Fresh entries (younger than `ttl`) are returned as is.
+    - Expired entries younger than `ttl + max_stale` are returned immediately
+      while a single background refresh runs.
+    - When a fetch fails, the last good value keeps being served, and the
+      failure is remembered for `error_ttl` so a failing upstream is not
+      hammered by every request. Client errors (an HTTPException below 500,
+      e.g. an unknown municipio) say nothing about the upstream and are not
+      remembered.
+    - Concurrent misses on the same key share a single in-flight fetch
+      (single-flight).
+    - Refreshes that change an entry's value are announced on the change
+      feed (core.events), for /events/stream.
+    - If `persistent`, entries are written to the on-disk snapshot store as
+      they refresh and read back lazily on the first miss after a restart.
+      Stored entries older than any `ttl + max_stale` are deleted hourly.
+      The store is shared by all uvicorn workers: one worker at a time
+      refreshes a key (see SnapshotStore.acquire), the others take its result,
+      as well as any value another worker stored less than `ttl / 2` ago.
+    - `set_ttl` gives a key its own TTL, for entries refreshed on their own
+      schedule (e.g. each concert venue).
+    - Besides `maxsize` entries, every cache shares the byte budget of
+      CACHE_MAX_MB (see CacheBudget); `refetch_cost` says how much longer
+      this cache's entries deserve to be kept than a cheap search result.
+
+    All access happens on the event loop, so no locking is needed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: timedelta,
+        maxsize: int = 1024,
+        max_stale: timedelta = MAX_STALE,
+        error_ttl: timedelta = ERROR_TTL,
+        persistent: bool = True,
+        refetch_cost: timedelta = timedelta(0),
+    ):
+        super().__init__(name, maxsize, refetch_cost)
+        self.persistent = persistent
+        self.ttl = ttl.total_seconds()
+        self.max_stale = max_stale.total_seconds()
+        self.error_ttl = error_ttl.total_seconds()
+        self._errors: dict = {}
+        self._inflight: "dict[Hashable, asyncio.Task]" = {}
+        self._pruned_at = 0.0
+        self._key_ttls: "dict[Hashable, float]" = {}
+
+    def set_ttl(self, key: Hashable, ttl: timedelta):
+        """Give one key a TTL of its own instead of the cache's"""
+        self._key_ttls[key] = ttl.total_seconds()
+
+    def ttl_of(self, key: Hashable) -> float:
+        return self._key_ttls.get(key, self.ttl)
+
+    async def get(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> CacheResult:
+        entry = self.entries.get(key)
+        if entry is None and self.persistent:
+            entry = await self._load(key)
+        if entry is not None:
+            age = entry.age
+            ttl = self.ttl_of(key)
+            entry.last_used = time.time()
+            if age < ttl:
+                self.entries.move_to_end(key)
+                CACHE_REQUESTS.inc(self.name, "hit")
+                return CacheResult(entry.value, age, stale=False, fetched_at=entry.fetched_at)
+            if age < ttl + self.max_stale:
+                self.entries.move_to_end(key)
+                if not self._recently_failed(key):
+                    self._start_fetch(key, fetch)
+                CACHE_REQUESTS.inc(self.name, "stale")
+                return CacheResult(entry.value, age, stale=True, fetched_at=entry.fetched_at)
+            # Too old to be useful, even as a fallback
+            self._remove(key)
+
+        CACHE_REQUESTS.inc(self.name, "miss")
+        error = self._recently_failed(key)
+        if error is not None:
+            raise error
+        entry = await asyncio.shield(self._start_fetch(key, fetch))
+        return CacheResult(entry.value, 0.0, stale=False, fetched_at=entry.fetched_at)
+
+    async def refresh(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Fetch a new value and store it. On failure the previous entry is kept.
+
+        If a fetch for the same key is already running, wait for its result
+        instead of starting another one.
+        """
+        if key not in self.entries and self.persistent:
+            await self._load(key)
+        # Shielded so a disconnecting client does not cancel the fetch for everyone else
+        entry = await asyncio.shield(self._start_fetch(key, fetch))
+        return entry.value
+
+    def peek(self, key: Hashable) -> Optional[CacheEntry]:
+        """
+        The current entry for a key whatever its age, without fetching.
+
+        Only looks in memory: get() and refresh() read the store before
+        they fetch, so a fetch function peeking at its own key sees the
+        stored entry after a restart.
+        """
+        return self.entries.get(key)
+
+    def clear(self):
+        super().clear()
+        self._errors.clear()
+
+    def _start_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.create_task(self._run_fetch(key, fetch))
+            # Background refreshes have nobody awaiting them; mark their errors as handled
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+    async def _run_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> CacheEntry:
+        try:
+            value, fetched_at = await self._fetch_shared(key, fetch)
+        except Exception as e:
+            if getattr(e, "status_code", 500) >= 500:
+                self._errors[key] = (e, time.time())
+            if key in self.entries:
+                print(f"Error refreshing {self.name} cache, serving stale data: {getattr(e, 'detail', e)}")
+            raise
+        finally:
+            del self._inflight[key]
+        self._errors.pop(key, None)
+        previous = self.entries.get(key)
+        entry = self.set(key, value, fetched_at)
+        if previous is None or previous.value != value:
+            feed.publish(self.name, key, entry.fetched_at)
+        return entry
+
+    async def _fetch_shared(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Tuple[Any, Optional[float]]:
+        """
+        Fetch a value, unless another worker is fetching it or just did.
+
+        Returns:
+            Tuple of (value, fetched_at), fetched_at is None for a value fetched
+            by this process without a store
+        """
+        if not (self.persistent and store.enabled):
+            return await fetch(), None
+
+        local = self.entries.get(key)
+        known = local.fetched_at if local is not None else 0.0
+        give_up_at = time.time() + LEASE_SECONDS
+        while True:
+            shared_at = await asyncio.to_thread(store.fetched_at, self.name, key)
+            if shared_at is not None and shared_at > known and time.time() - shared_at < self.ttl_of(key) / 2:
+                snapshot = await asyncio.to_thread(store.load, self.name, key)
+                if snapshot is not None:
+                    return snapshot
+            if await asyncio.to_thread(store.acquire, self.name, key):
+                break
+            if time.time() > give_up_at:
+                # The lease should have expired by now; fetch rather than wait forever
+                break
+            await asyncio.sleep(LEASE_POLL_INTERVAL)
+
+        try:
+            value = await fetch()
+            fetched_at = time.time()
+            await asyncio.to_thread(store.save, self.name, key, value, fetched_at)
+            await self._prune()
+            return value, fetched_at
+        finally:
+            await asyncio.to_thread(store.release, self.name, key)
+
+    async def _prune(self):
+        # get() never serves entries this old, they would only grow the file on the SD card
+        now = time.time()
+        if now - self._pruned_at < PRUNE_INTERVAL:
+            return
+        self._pruned_at = now
+        longest_ttl = max([self.ttl, *self._key_ttls.values()])
+        await asyncio.to_thread(store.prune, self.name, now - longest_ttl - self.max_stale)
+
+    async def _load(self, key: Hashable) -> Optional[CacheEntry]:
+        # In a thread: another worker's write can hold the database for up to busy_timeout
+        snapshot = await asyncio.to_thread(store.load, self.name, key) if store.enabled else None
+        if snapshot is None:
+            return None
+        # Another request may have stored a newer value while this one was reading
+        entry = self.entries.get(key)
+        if entry is not None and entry.fetched_at >= snapshot[1]:
+            return entry
+        return self.set(key, *snapshot)
+
+    def _recently_failed(self, key: Hashable) -> Optional[Exception]:
+        failure = self._errors.get(key)
+        if failure and time.time() - failure[1] < self.error_ttl:
+            return failure[0]
+        return None
+
+
+def cached(cache: StaleCache, key: Callable[..., Hashable] = hashkey):
+    """
+    Decorator caching a coroutine function's results in a StaleCache.
+
+    Awaiting the wrapped function returns the value. The wrapper also has
+    `lookup(*args)` returning a CacheResult (for the staleness headers) and
+    `refresh(*args)` forcing a new fetch (for the background scheduler).
+    """
+
+    def decorator(func):
+        async def wrapper(*args, **kwargs):
+            return (await lookup(*args, **kwargs)).value
+
+        async def lookup(*args, **kwargs) -> CacheResult:
+            return await cache.get(key(*args, **kwargs), lambda: func(*args, **kwargs))
+
+        async def refresh(*args, **kwargs):
+            return await cache.refresh(key(*args, **kwargs), lambda: func(*args, **kwargs))
+
+        wrapper.cache = cache
+        wrapper.cache_key = key
+        wrapper.lookup = lookup
+        wrapper.refresh = refresh
+        return update_wrapper(wrapper, func)
+
+    return decorator
+
+
+def set_cache_headers(response: Response, *results: CacheResult):
+    """Report the age of the oldest cached value a response was built from"""
+    if not results:
+        return
+    response.headers["Age"] = str(int(max(result.age for result in results)))
+    if any(result.stale for result in results):
+        response.headers["Warning"] = '110 - "Response is Stale"'
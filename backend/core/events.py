@@ -0,0 +1,82 @@
+import asyncio
+import os
+import time
+from typing import Dict, Hashable, List, Optional, Set
+
+# Open /events/stream connections allowed at once, per uvicorn worker
+MAX_SUBSCRIBERS = int(os.getenv("SSE_MAX_CONNECTIONS", 16))
+# Seconds between keep-alive comments on an idle stream
+HEARTBEAT_INTERVAL = float(os.getenv("SSE_HEARTBEAT_SECONDS", 15))
+
+
+class TooManySubscribersError(Exception):
+    pass
+
+
+class Subscriber:
+    """
+    One connected client's pending changes.
+
+    Changes are coalesced per (source, key): a client that falls behind only
+    gets the latest version of each entry, so memory per client stays bounded.
+    """
+
+    __slots__ = ("pending", "wakeup")
+
+    def __init__(self):
+        self.pending: Dict[tuple, dict] = {}
+        self.wakeup = asyncio.Event()
+
+    async def next_changes(self, timeout: float) -> List[dict]:
+        """Wait up to `timeout` seconds for changes, returning [] if none came"""
+        if not self.pending:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        self.wakeup.clear()
+        changes = list(self.pending.values())
+        self.pending.clear()
+        return changes
+
+
+class ChangeFeed:
+    """
+    Announces cache entries whose value changed after a refresh.
+
+    Each source (a cache name) has a version that goes up on every change,
+    so clients can tell whether they are up to date without refetching
+    anything. Versions are the fetch time (in milliseconds) of the newest
+    data, which workers sharing the cache store agree on, so a client that
+    reconnects to another uvicorn worker never sees a version go backwards
+    for data it already has.
+
+    Subscribers are per worker: each worker publishes the changes it picks
+    up, and MAX_SUBSCRIBERS applies to each worker separately.
+    """
+
+    def __init__(self, max_subscribers: int = MAX_SUBSCRIBERS):
+        self.max_subscribers = max_subscribers
+        self.versions: Dict[str, int] = {}
+        self.subscribers: Set[Subscriber] = set()
+
+    def publish(self, source: str, key: Optional[Hashable] = None, fetched_at: Optional[float] = None):
+        version = int((fetched_at or time.time()) * 1000)
+        version = self.versions[source] = max(version, self.versions.get(source, 0))
+        change = {"source": source, "version": version, "key": list(key) if isinstance(key, tuple) else key}
+        for subscriber in self.subscribers:
+            subscriber.pending[(source, key)] = change
+            subscriber.wakeup.set()
+
+    def subscribe(self) -> Subscriber:
+        if len(self.subscribers) >= self.max_subscribers:
+            raise TooManySubscribersError(f"At most {self.max_subscribers} event streams can be open")
+        subscriber = Subscriber()
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+
+
+feed = ChangeFeed()
@@ -0,0 +1,78 @@
+import asyncio
+import os
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+import httpx
+from core import quota
+from core.metrics import UPSTREAM_DURATION, UPSTREAM_ERRORS
+
+# Shared by every router so AEMET, Guardian and onsevilla connections are pooled and kept alive
+TIMEOUT = httpx.Timeout(20.0, connect=5.0)
+LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60)
+# Max concurrent requests to a single upstream host
+MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", 4))
+
+_client: Optional[httpx.AsyncClient] = None
+_host_limits: Dict[str, asyncio.Semaphore] = {}
+
+
+async def start():
+    """Create the shared client (called from the app lifespan)"""
+    global _client
+    _client = httpx.AsyncClient(
+        timeout=TIMEOUT,
+        limits=LIMITS,
+        follow_redirects=True,
+        headers={"User-Agent": "smartablero"},
+    )
+
+
+async def close():
+    """Close the shared client and its pooled connections"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    _host_limits.clear()
+
+
+def get_client() -> httpx.AsyncClient:
+    if _client is None:
+        raise RuntimeError("HTTP client is not started")
+    return _client
+
+
+async def get(url: str, hop: str = "request", **kwargs) -> httpx.Response:
+    """
+    GET a URL through the shared client, with at most MAX_CONNECTIONS_PER_HOST
+    requests in flight per host, once the host's quota (core.quota) allows it.
+
+    Args:
+        url: The URL to fetch
+        hop: Which step of a multi-request fetch this is, for the metrics
+        **kwargs: Passed through to httpx (params, headers, timeout, ...)
+
+    Returns:
+        The httpx response (status is not checked)
+
+    Raises:
+        QuotaExceededError: If the host's rate or daily quota refused the call
+    """
+    host = urlsplit(url).netloc
+    await quota.acquire(host)
+    limit = _host_limits.get(host)
+    if limit is None:
+        limit = _host_limits[host] = asyncio.Semaphore(MAX_CONNECTIONS_PER_HOST)
+    async with limit:
+        started = time.perf_counter()
+        try:
+            response = await get_client().get(url, **kwargs)
+        except httpx.HTTPError:
+            UPSTREAM_ERRORS.inc(host, hop)
+            raise
+        finally:
+            UPSTREAM_DURATION.observe(time.perf_counter() - started, host, hop)
+    if response.status_code >= 400:
+        UPSTREAM_ERRORS.inc(host, hop)
+    return response
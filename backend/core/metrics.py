@@ -0,0 +1,144 @@
+import bisect
+import os
+import resource
+import time
+from typing import Dict, List, Sequence, Tuple
+
+# Latency buckets in seconds, from cached responses (ms) to slow upstream hops (s)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """A monotonically increasing value per label combination"""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+        REGISTRY.append(self)
+
+    def inc(self, *label_values: str, amount: float = 1.0):
+        self.values[label_values] = self.values.get(label_values, 0.0) + amount
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for label_values, value in self.values.items():
+            lines.append(f"{self.name}{_labels(self.labels, label_values)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """Observations counted into cumulative buckets per label combination"""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # Per label combination: [count per bucket (last one is +Inf), sum]
+        self.values: Dict[Tuple[str, ...], list] = {}
+        REGISTRY.append(self)
+
+    def observe(self, value: float, *label_values: str):
+        series = self.values.get(label_values)
+        if series is None:
+            series = self.values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                bucket_labels = _labels(self.labels, label_values, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, label_values)} {total:g}")
+            lines.append(f"{self.name}_count{_labels(self.labels, label_values)} {cumulative}")
+        return lines
+
+
+REGISTRY: list = []
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time until response headers, per route", ("method", "route", "status")
+)
+UPSTREAM_DURATION = Histogram(
+    "upstream_request_duration_seconds", "Duration of upstream HTTP requests", ("host", "hop")
+)
+UPSTREAM_ERRORS = Counter(
+    "upstream_errors_total", "Upstream HTTP requests that failed or returned an error status", ("host", "hop")
+)
+UPSTREAM_RETRIES = Counter("upstream_retries_total", "Upstream calls retried after a failed attempt", ("upstream",))
+QUOTA_REFUSALS = Counter(
+    "upstream_quota_refusals_total", "Upstream calls refused by the rate or daily quota", ("upstream", "priority")
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups by result (hit, stale or miss)", ("cache", "result")
+)
+CACHE_EVICTIONS = Counter("cache_evictions_total", "Cache entries evicted to stay under maxsize", ("cache",))
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # Not Linux: peak rather than current RSS (kilobytes on Linux, bytes on macOS)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.collect())
+    lines.append("# HELP process_resident_memory_bytes Resident memory size in bytes")
+    lines.append("# TYPE process_resident_memory_bytes gauge")
+    lines.append(f"process_resident_memory_bytes {_rss_bytes()}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing each request until its response headers are sent.
+
+    Timing stops at the headers so long-lived streams (/events/stream) do not
+    skew the histogram. Requests are labelled with the route template, not the
+    raw path, to keep the number of series bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                route = scope.get("route")
+                REQUEST_DURATION.observe(
+                    time.perf_counter() - started,
+                    scope["method"],
+                    route.path if route is not None else "unmatched",
+                    str(message["status"]),
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
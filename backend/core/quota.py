@@ -0,0 +1,171 @@
+import asyncio
+import math
+import os
+import time
+from contextvars import ContextVar
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+from core.metrics import QUOTA_REFUSALS
+from core.resilience import UpstreamError, extend_deadline
+from core.store import WORKERS
+
+# Share of the daily quota kept for scheduled refreshes, user-driven cache misses stop before it
+DAILY_RESERVE = float(os.getenv("QUOTA_DAILY_RESERVE", 0.2))
+# How long a call may wait for a rate token before it is refused (not counted in the upstream deadline)
+SCHEDULED_MAX_WAIT = 60.0
+ON_DEMAND_MAX_WAIT = 2.0
+
+# "scheduled" inside background refresh jobs (set by core.scheduler), "on_demand" for request-driven fetches
+priority: ContextVar[str] = ContextVar("upstream_priority", default="on_demand")
+
+
+class QuotaExceededError(UpstreamError):
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after  # Seconds until a call could be allowed again
+
+
+class UpstreamQuota:
+    """
+    Token bucket (`per_minute`, bursts of up to `burst` calls) plus a daily
+    call quota for one upstream host. `per_minute` or `per_day` of 0 means
+    no limit of that kind.
+
+    Scheduled refreshes wait until a token is free and may use the whole
+    daily quota. Request-driven calls only get a token that is available
+    almost right away (they may reserve one up to ON_DEMAND_MAX_WAIT ahead),
+    and stop once they have used all but DAILY_RESERVE of the daily quota
+    between them, so a burst of cache misses cannot starve the refreshes
+    every widget depends on. Refreshes never reserve ahead, so they cannot
+    starve requests either. Refused calls raise QuotaExceededError, and the
+    caches keep serving what they have.
+
+    Each worker process tracks its own usage, so the rate, burst and daily
+    quota are split evenly between the UVICORN_WORKERS workers.
+    """
+
+    def __init__(self, name: str, host: str, per_minute: float, per_day: int = 0, burst: float = 1.0):
+        self.name = name
+        self.host = host
+        self.rate = max(0.0, per_minute) / 60.0 / WORKERS  # 0: no rate limit
+        self.burst = max(1.0, burst / WORKERS)
+        self.per_day = per_day // WORKERS if per_day else 0  # 0: no daily quota
+        self.tokens = self.burst
+        self.updated_at = time.monotonic()
+        self.day = date.today()
+        self.used_today = {"scheduled": 0, "on_demand": 0}
+        self.refused = {"scheduled": 0, "on_demand": 0}
+
+    async def acquire(self):
+        call_priority = priority.get()
+        scheduled = call_priority == "scheduled"
+        self._check_daily(call_priority)
+        if not self.rate:
+            self.used_today[call_priority] += 1
+            return
+
+        if scheduled:
+            # Wait for a free token without reserving one, so refreshes never push requests into debt
+            waited = 0.0
+            while self._refill() < 1:
+                wait = (1 - self.tokens) / self.rate
+                if waited + wait > SCHEDULED_MAX_WAIT:
+                    self._refuse(call_priority, f"{self.name} rate limit reached, next call possible in {wait:.0f}s", wait)
+                extend_deadline(wait)
+                await asyncio.sleep(wait)
+                waited += wait
+            # The day may have turned, or other calls used up the quota, while this one waited
+            self._check_daily(call_priority)
+            self.tokens -= 1
+            self.used_today[call_priority] += 1
+            return
+
+        # Reserve a token synchronously (going into debt if needed), so waiting requests are served in order
+        wait = 0.0 if self._refill() >= 1 else (1 - self.tokens) / self.rate
+        if wait > ON_DEMAND_MAX_WAIT:
+            self._refuse(call_priority, f"{self.name} rate limit reached, next call possible in {wait:.0f}s", wait)
+        self.tokens -= 1
+        self.used_today[call_priority] += 1
+        if wait:
+            extend_deadline(wait)
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                # The call will not be made, give its token back
+                self.tokens += 1
+                self.used_today[call_priority] -= 1
+                raise
+
+    def _refill(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        return self.tokens
+
+    def _roll_day(self):
+        """Start counting a new day's calls on the first use after midnight"""
+        today = date.today()
+        if today != self.day:
+            self.day = today
+            self.used_today = {"scheduled": 0, "on_demand": 0}
+
+    def _check_daily(self, call_priority: str):
+        self._roll_day()
+        if not self.per_day:
+            return
+        midnight = datetime.combine(self.day + timedelta(days=1), datetime.min.time())
+        until_tomorrow = (midnight - datetime.now()).total_seconds()
+        if sum(self.used_today.values()) >= self.per_day:
+            self._refuse(call_priority, f"{self.name} daily quota of {self.per_day} calls is used up", until_tomorrow)
+        on_demand_limit = int(self.per_day * (1 - DAILY_RESERVE))
+        if call_priority != "scheduled" and self.used_today["on_demand"] >= on_demand_limit:
+            self._refuse(
+                call_priority, f"{self.name} daily quota for requests of {on_demand_limit} calls is used up", until_tomorrow
+            )
+
+    def _refuse(self, call_priority: str, message: str, retry_after: float):
+        self.refused[call_priority] += 1
+        QUOTA_REFUSALS.inc(self.name, call_priority)
+        raise QuotaExceededError(message, retry_after)
+
+    def snapshot(self) -> dict:
+        self._roll_day()
+        return {
+            "name": self.name,
+            "host": self.host,
+            "per_minute": self.rate * 60 if self.rate else None,
+            "tokens": round(self._refill(), 2) if self.rate else None,
+            "per_day": self.per_day or None,
+            "used_today": dict(self.used_today),
+            "remaining_today": max(0, self.per_day - sum(self.used_today.values())) if self.per_day else None,
+            "refused": dict(self.refused),
+        }
+
+
+QUOTAS: Dict[str, UpstreamQuota] = {}
+
+
+def register(name: str, host: str, per_minute: float, per_day: int = 0, burst: float = 1.0) -> UpstreamQuota:
+    """
+    Put calls to `host` under a quota (called by the routers for their upstreams).
+
+    Raises:
+        ValueError: If `host` already has another upstream's quota
+    """
+    existing = QUOTAS.get(host)
+    if existing is not None and existing.name != name:
+        raise ValueError(f"{host} already has the {existing.name} quota, cannot register {name} for it")
+    quota = QUOTAS[host] = UpstreamQuota(name, host, per_minute, per_day, burst)
+    return quota
+
+
+def retry_headers(error: QuotaExceededError) -> Dict[str, str]:
+    """Retry-After header for the 503 a router answers a refused call with"""
+    return {"Retry-After": str(max(1, math.ceil(error.retry_after)))}
+
+
+async def acquire(host: str):
+    """Wait for the right to call `host`, raising QuotaExceededError if it is refused"""
+    quota: Optional[UpstreamQuota] = QUOTAS.get(host)
+    if quota is not None:
+        await quota.acquire()
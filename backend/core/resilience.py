@@ -0,0 +1,209 @@
+import asyncio
+import os
+import random
+import time
+from contextvars import ContextVar
+from datetime import timedelta
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+import httpx
+from core.metrics import UPSTREAM_RETRIES
+
+T = TypeVar("T")
+
+# Consecutive failed attempts before an upstream's circuit opens
+FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 5))
+# How long an open circuit fails fast before letting a trial call through
+COOLDOWN = timedelta(seconds=int(os.getenv("CIRCUIT_COOLDOWN_SECONDS", 60)))
+# Upper bound for one call, including every retry and backoff (time queued for a quota is not counted)
+DEADLINE = timedelta(seconds=int(os.getenv("UPSTREAM_DEADLINE_SECONDS", 30)))
+
+# When the call_with_retry running in this context gives up, as a time.monotonic() value in a list so it can be pushed back
+_expires_at: ContextVar[Optional[list]] = ContextVar("upstream_deadline", default=None)
+
+
+class UpstreamError(Exception):
+    """An upstream call was not attempted or did not finish in time"""
+
+
+class CircuitOpenError(UpstreamError):
+    pass
+
+
+class UpstreamRequestError(UpstreamError):
+    """The upstream answered but rejected what was asked for (e.g. an unknown municipio), retrying will not help"""
+
+
+class DeadlineExceededError(UpstreamError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Per-upstream circuit breaker.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls
+    fail immediately for `cooldown`. After that a single trial call is let
+    through (half-open): success closes the circuit, failure opens it again.
+
+    Breakers live in each uvicorn worker: every worker counts the failures it
+    sees and opens its own circuit.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = FAILURE_THRESHOLD, cooldown: timedelta = COOLDOWN):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown.total_seconds()
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._trial_running = False
+
+    def before_call(self):
+        if self.state == "open":
+            if time.time() - self.opened_at < self.cooldown:
+                raise CircuitOpenError(f"{self.name} circuit is open after {self.failures} failures")
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._trial_running:
+                raise CircuitOpenError(f"{self.name} circuit is half-open, trial call in progress")
+            self._trial_running = True
+
+    def cancel_trial(self):
+        """Free the half-open trial slot when a call is abandoned without a result"""
+        self._trial_running = False
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+
+    def record_failure(self, error: Exception):
+        self.failures += 1
+        self.last_error = str(error) or type(error).__name__
+        self._trial_running = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.time()
+
+    def snapshot(self) -> dict:
+        retry_in = None
+        if self.state == "open":
+            retry_in = max(0.0, self.cooldown - (time.time() - self.opened_at))
+        return {
+            "name": self.name,
+            "state": self.state,
+            "failures": self.failures,
+            "retry_in": retry_in,
+            "last_error": self.last_error,
+        }
+
+
+def extend_deadline(seconds: float):
+    """Push back the deadline of the call_with_retry running in this context (e.g. by time spent waiting for a quota)"""
+    expires_at = _expires_at.get()
+    if expires_at is not None:
+        expires_at[0] += seconds
+
+
+BREAKERS: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(upstream: str) -> CircuitBreaker:
+    breaker = BREAKERS.get(upstream)
+    if breaker is None:
+        breaker = BREAKERS[upstream] = CircuitBreaker(upstream)
+    return breaker
+
+
+def _is_retryable(error: Exception) -> bool:
+    # Client errors (bad key, wrong URL, unknown municipio) will not fix themselves on retry,
+    # and say nothing about the upstream's health, so they do not count against its circuit
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status >= 500 or status == 429
+    return not isinstance(error, UpstreamRequestError)
+
+
+async def call_with_retry(
+    upstream: str,
+    func: Callable[[], Awaitable[T]],
+    max_retries: int = 3,
+    base_delay: float = 1.0,
+    max_delay: float = 8.0,
+    deadline: timedelta = DEADLINE,
+) -> T:
+    """
+    Call an upstream with retries, an overall deadline and a circuit breaker.
+
+    Backoff between attempts is exponential with full jitter and never blocks
+    the event loop. Time spent waiting for the upstream's quota (core.quota)
+    is left out of the deadline, so a queued call is not cut short or counted
+    as a failure. Only retryable failures (5xx, 429, transport errors,
+    malformed responses, the deadline) count towards opening the circuit; a
+    client error is raised right away and leaves the circuit as it was, so
+    requests for bogus resources cannot open it for everyone.
+
+    Args:
+        upstream: Name of the upstream, one circuit breaker per name
+        func: Coroutine function performing a single attempt
+        max_retries: Maximum number of attempts
+        base_delay: Backoff base in seconds (attempt n waits up to base_delay * 2**n)
+        max_delay: Cap on a single backoff in seconds
+        deadline: Time budget for all attempts together
+
+    Returns:
+        Whatever `func` returns
+
+    Raises:
+        CircuitOpenError: If the upstream's circuit is open
+        DeadlineExceededError: If the attempts did not finish within `deadline`
+        httpx.HTTPError, ValueError, UpstreamRequestError: The last error raised by `func`
+    """
+    breaker = get_breaker(upstream)
+
+    async def attempts():
+        for attempt in range(max_retries):
+            breaker.before_call()
+            try:
+                result = await func()
+            except (httpx.HTTPError, ValueError, UpstreamRequestError) as e:
+                if not _is_retryable(e):
+                    breaker.cancel_trial()
+                    raise
+                breaker.record_failure(e)
+                if attempt == max_retries - 1:
+                    raise
+                UPSTREAM_RETRIES.inc(upstream)
+                await asyncio.sleep(random.uniform(0, min(max_delay, base_delay * 2 ** attempt)))
+            except BaseException:
+                # Cancelled by the deadline: free the half-open trial slot
+                breaker.cancel_trial()
+                raise
+            else:
+                breaker.record_success()
+                return result
+
+    expires_at = [time.monotonic() + deadline.total_seconds()]
+    context_token = _expires_at.set(expires_at)
+    try:
+        task = asyncio.ensure_future(attempts())
+    finally:
+        _expires_at.reset(context_token)
+    try:
+        # The deadline can move while waiting, so wait in steps until the attempts finish or it passes
+        while not task.done():
+            remaining = expires_at[0] - time.monotonic()
+            if remaining <= 0:
+                break
+            await asyncio.wait({task}, timeout=remaining)
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    if task.cancelled():
+        error = DeadlineExceededError(f"{upstream} did not respond within {deadline.total_seconds():g}s")
+        breaker.record_failure(error)
+        raise error
+    return task.result()
@@ -0,0 +1,131 @@
+import gzip
+import hashlib
+from typing import Any, Callable, Dict, Hashable, Optional
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from core.cache import CacheResult, DerivedCache, set_cache_headers
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+
+class PreparedResponse:
+    """
+    A JSON response body serialized once, with its compressed variants.
+
+    Each encoding is a different byte sequence, so each gets its own strong
+    ETag: the body's hash, suffixed with the encoding for compressed ones.
+    """
+
+    __slots__ = ("body", "etag", "gzip", "br")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        self.gzip = gzip.compress(body, compresslevel=6, mtime=0)
+        self.br = brotli.compress(body, quality=5) if brotli else None
+
+    def etag_for(self, encoding: Optional[str]) -> str:
+        return self.etag if encoding is None else f"{self.etag[:-1]}-{encoding}\""
+
+    def render(self, request: Request, *results: CacheResult) -> Response:
+        """
+        Build the response for a request: 304 if the client already has this
+        version, otherwise the best encoding the client accepts.
+
+        Args:
+            request: The incoming request (If-None-Match, Accept-Encoding)
+            *results: The cache results the body was built from, for the Age headers
+        """
+        accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+        encoding = None
+        content = self.body
+        if self.br is not None and accepted.get("br", 0) > 0:
+            encoding, content = "br", self.br
+        elif accepted.get("gzip", 0) > 0:
+            encoding, content = "gzip", self.gzip
+
+        headers = {"ETag": self.etag_for(encoding), "Vary": "Accept-Encoding"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _etag_matches(if_none_match, headers["ETag"]):
+            response = Response(status_code=304, headers=headers)
+            set_cache_headers(response, *results)
+            return response
+
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+        response = Response(content=content, media_type="application/json", headers=headers)
+        set_cache_headers(response, *results)
+        return response
+
+
+def _accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    """
+    The q-value of each coding in an Accept-Encoding header ("gzip, br;q=0"
+    accepts gzip but refuses br). A "*" entry applies to codings not listed.
+    """
+    qualities: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name] = quality
+    if "*" in qualities:
+        for name in ("gzip", "br"):
+            qualities.setdefault(name, qualities["*"])
+    return qualities
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Proxies may weaken the tag (W/"...") after recompressing
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+def prepare(adapter: TypeAdapter, value: Any, exclude_unset: bool = False) -> PreparedResponse:
+    """
+    Validate a value against the endpoint's response model and serialize it,
+    leaving out fields the value did not set if `exclude_unset` (field projection)
+    """
+    return PreparedResponse(adapter.dump_json(adapter.validate_python(value), exclude_unset=exclude_unset))
+
+
+class ResponseCache:
+    """
+    Prepared responses keyed by endpoint and parameters.
+
+    An entry is reused as long as the `version` it was built for matches,
+    typically the fetch times of the cache entries it was built from, so the
+    body is validated, serialized and compressed once per upstream refresh.
+    The bodies count against the caches' memory budget (CACHE_MAX_MB).
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.entries = DerivedCache("responses", maxsize=maxsize)
+
+    def get(self, key: Hashable, version: Hashable, build: Callable[[], PreparedResponse]) -> PreparedResponse:
+        cached: Optional[tuple] = self.entries.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        prepared = build()
+        self.entries.set(key, (version, prepared))
+        return prepared
+
+    def stats(self) -> dict:
+        return self.entries.stats()
+
+
+response_cache = ResponseCache()
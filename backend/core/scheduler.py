@@ -0,0 +1,52 @@
+import asyncio
+from datetime import timedelta
+from typing import Awaitable, Callable, List
+from core import quota
+
+
+class RefreshJob:
+    """A data source that is refreshed in the background on its own interval"""
+
+    def __init__(self, name: str, func: Callable[[], Awaitable[None]], interval: timedelta):
+        self.name = name
+        self.func = func
+        self.interval = interval
+
+
+class Scheduler:
+    """
+    Runs refresh jobs in the background for the lifetime of the app.
+
+    Each job runs once at startup and then every `interval`, so request
+    handlers only ever read values that are already in the cache.
+    """
+
+    def __init__(self):
+        self.jobs: List[RefreshJob] = []
+        self._tasks: List[asyncio.Task] = []
+
+    def add_job(self, name: str, func: Callable[[], Awaitable[None]], interval: timedelta):
+        self.jobs.append(RefreshJob(name, func, interval))
+
+    async def start(self):
+        for job in self.jobs:
+            self._tasks.append(asyncio.create_task(self._run(job), name=f"refresh:{job.name}"))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def _run(self, job: RefreshJob):
+        # Upstream calls made by refresh jobs go first when quotas are tight
+        quota.priority.set("scheduled")
+        while True:
+            try:
+                await job.func()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Keep the previous cached value and try again next round
+                print(f"Error refreshing {job.name}: {getattr(e, 'detail', e)}")
+            await asyncio.sleep(job.interval.total_seconds())
@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Hashable, Optional, Tuple
+
+_backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Where cache snapshots survive restarts. Set to an empty string to disable.
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", os.path.join(_backend_dir, "data", "cache.sqlite3"))
+# How long a worker may hold the right to refresh an entry before others assume it died
+LEASE_SECONDS = float(os.getenv("CACHE_LEASE_SECONDS", 60))
+# uvicorn worker processes sharing this store; per-process limits are divided between them
+WORKERS = max(1, int(os.getenv("UVICORN_WORKERS", 1)))
+
+
+class SnapshotStore:
+    """
+    SQLite (WAL mode) snapshot of cached payloads, so a restart starts warm.
+
+    One row per cache entry holding the zlib-compressed JSON payload, a digest
+    of it and the time it was fetched. Rows are written one at a time as
+    entries refresh; an unchanged payload only updates its timestamp, which
+    keeps writes on the Pi's SD card small. Rows too old to be served are
+    pruned by their cache.
+
+    The same file is shared by every uvicorn worker. A lease row per entry
+    makes sure only one worker refreshes it at a time (cross-process
+    single-flight); the others pick up its result from the entries table.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Durable enough for a cache, and far fewer fsyncs than FULL
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # Other workers may be writing, wait for them instead of failing with "database is locked"
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    digest TEXT NOT NULL,
+                    payload BLOB NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS leases (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    owner TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                ) WITHOUT ROWID
+                """
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def load(self, namespace: str, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """Return (value, fetched_at) for a stored entry, or None"""
+        if not self.enabled:
+            return None
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT payload, fetched_at FROM entries WHERE namespace = ? AND key = ?",
+                    (namespace, _encode_key(key)),
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Error reading cache snapshot: {e}")
+            return None
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row[0])), row[1]
+
+    def save(self, namespace: str, key: Hashable, value: Any, fetched_at: float):
+        if not self.enabled:
+            return
+        data = json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        encoded_key = _encode_key(key)
+        try:
+            with self._lock:
+                conn = self._connect()
+                updated = conn.execute(
+                    "UPDATE entries SET fetched_at = ? WHERE namespace = ? AND key = ? AND digest = ?",
+                    (fetched_at, namespace, encoded_key, digest),
+                ).rowcount
+                if not updated:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO entries (namespace, key, fetched_at, digest, payload) VALUES (?, ?, ?, ?, ?)",
+                        (namespace, encoded_key, fetched_at, digest, zlib.compress(data, 6)),
+                    )
+                conn.commit()
+        except sqlite3.Error as e:
+            # The in-memory cache still works, only the snapshot is missing
+            print(f"Error writing cache snapshot: {e}")
+
+    def prune(self, namespace: str, older_than: float) -> int:
+        """Delete a namespace's entries fetched before `older_than`, returning how many went"""
+        if not self.enabled:
+            return 0
+        try:
+            with self._lock:
+                conn = self._connect()
+                deleted = conn.execute(
+                    "DELETE FROM entries WHERE namespace = ? AND fetched_at < ?", (namespace, older_than)
+                ).rowcount
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"Error pruning cache snapshot: {e}")
+            return 0
+        return deleted
+
+    def fetched_at(self, namespace: str, key: Hashable) -> Optional[float]:
+        """When the stored entry was fetched, without reading its payload"""
+        if not self.enabled:
+            return None
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT fetched_at FROM entries WHERE namespace = ? AND key = ?",
+                    (namespace, _encode_key(key)),
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Error reading cache snapshot: {e}")
+            return None
+        return row[0] if row else None
+
+    def acquire(self, namespace: str, key: Hashable, duration: float = LEASE_SECONDS) -> bool:
+        """
+        Take the lease to refresh an entry, unless another worker holds it.
+
+        Returns True when this process holds the lease (also when the store is
+        disabled or unreadable, so refreshes never block on it).
+        """
+        if not self.enabled:
+            return True
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                acquired = conn.execute(
+                    """
+                    INSERT INTO leases (namespace, key, owner, expires_at) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (namespace, key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+                    WHERE leases.expires_at < ? OR leases.owner = excluded.owner
+                    """,
+                    (namespace, _encode_key(key), _owner, now + duration, now),
+                ).rowcount
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"Error taking cache lease: {e}")
+            return True
+        return bool(acquired)
+
+    def release(self, namespace: str, key: Hashable):
+        if not self.enabled:
+            return
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "DELETE FROM leases WHERE namespace = ? AND key = ? AND owner = ?",
+                    (namespace, _encode_key(key), _owner),
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"Error releasing cache lease: {e}")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Leases are held per process, tasks within one process already share in-flight fetches
+_owner = str(os.getpid())
+
+
+def _encode_key(key: Hashable) -> str:
+    # Cache keys are tuples of str/int/None, whose repr is stable
+    return repr(tuple(key))
+
+
+store = SnapshotStore(CACHE_DB_PATH)
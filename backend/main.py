@@ -1,8 +1,38 @@
+from contextlib import asynccontextmanager
+from functools import partial
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routers import weather, concerts, news
+from routers import weather, concerts, news, dashboard, events, status, calendar
+from core import http_client
+from core.archive import archive
+from core.metrics import MetricsMiddleware
+from core.scheduler import Scheduler
+from core.store import store
 
-app = FastAPI()
+scheduler = Scheduler()
+scheduler.add_job("weather", weather.refresh_weather, weather.REFRESH_INTERVAL)
+for venue in concerts.VENUES:
+    # Each venue refreshes on its own interval, a failing venue does not hold up the others
+    scheduler.add_job(f"concerts:{venue.name}", partial(concerts.refresh_venue, venue), venue.refresh_interval)
+scheduler.add_job("news", news.refresh_news, news.REFRESH_INTERVAL)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await http_client.start()
+    calendar.load_default()
+    # Warm every cache at startup and keep it warm, so handlers never wait on upstream APIs
+    await scheduler.start()
+    yield
+    await scheduler.stop()
+    await http_client.close()
+    store.close()
+    archive.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+app.add_middleware(MetricsMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,4 +44,8 @@ app.add_middleware(
 
 app.include_router(weather.router)
 app.include_router(concerts.router)
-app.include_router(news.router)
\ No newline at end of file
+app.include_router(news.router)
+app.include_router(dashboard.router)
+app.include_router(events.router)
+app.include_router(calendar.router)
+app.include_router(status.router)
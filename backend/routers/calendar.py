@@ -0,0 +1,239 @@
+from typing import Dict, List, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Query, Request
+from pydantic import BaseModel, TypeAdapter
+from datetime import date, datetime, timedelta
+import bisect
+import os
+import re
+import threading
+from core.responses import prepare, response_cache
+
+router = APIRouter()
+
+_current_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Every .ics file in this directory is a calendar source, named after the file
+CALENDAR_DIR = os.getenv("CALENDAR_DIR", os.path.join(os.path.dirname(_current_dir), "calendars"))
+# Source served when a request does not pass ?source=
+DEFAULT_SOURCE = os.getenv("CALENDAR_DEFAULT_SOURCE", "calendarifestius_es")
+
+SOURCE_PATTERN = r"^[\w.-]+$"
+
+
+class Holiday(BaseModel):
+    title: str
+    description: Optional[str] = None
+    start: date
+    end: date  # Exclusive, as in the ICS file (a one-day holiday ends the next day)
+    source: str
+    uid: Optional[str] = None
+
+
+class CalendarSource(BaseModel):
+    name: str
+    loaded: bool  # Parsed yet, sources are parsed when first requested
+    events: Optional[int] = None
+    modified: datetime
+
+
+def _unfold(text: str) -> List[str]:
+    """Split ICS text into content lines, joining folded continuation lines"""
+    lines: List[str] = []
+    for line in text.splitlines():
+        if line[:1] in (" ", "\t") and lines:
+            lines[-1] += line[1:]
+        elif line:
+            lines.append(line)
+    return lines
+
+
+def _unescape(value: str) -> str:
+    return re.sub(r"\\([\\;,nN])", lambda match: "\n" if match.group(1) in "nN" else match.group(1), value)
+
+
+def _parse_ics_date(value: str) -> Optional[date]:
+    # DATE (20250101) or DATE-TIME (20250101T090000[Z]), holidays only need the day
+    try:
+        return datetime.strptime(value[:8], "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+def parse_ics(text: str, source: str) -> List[Holiday]:
+    """
+    Parse the VEVENTs of an ICS calendar.
+
+    Only what a holiday needs is read (UID, SUMMARY, DESCRIPTION, DTSTART,
+    DTEND); events without a usable start are skipped.
+    """
+    holidays = []
+    event: Optional[Dict[str, str]] = None
+    for line in _unfold(text):
+        if line == "BEGIN:VEVENT":
+            event = {}
+        elif line == "END:VEVENT" and event is not None:
+            start = _parse_ics_date(event.get("DTSTART", ""))
+            if start is not None:
+                end = _parse_ics_date(event.get("DTEND", "")) or start + timedelta(days=1)
+                holidays.append(Holiday(
+                    title=_unescape(event.get("SUMMARY", "")),
+                    description=_unescape(event["DESCRIPTION"]) if "DESCRIPTION" in event else None,
+                    start=start,
+                    end=max(end, start + timedelta(days=1)),
+                    source=source,
+                    uid=event.get("UID"),
+                ))
+            event = None
+        elif event is not None and ":" in line:
+            name, value = line.split(":", 1)
+            # Drop parameters such as ;VALUE=DATE
+            event[name.split(";", 1)[0].upper()] = value
+    return holidays
+
+
+class HolidayIndex:
+    """
+    A source's holidays sorted by start day, for date-range lookups with bisect.
+
+    Holidays can span several days, so lookups start `max_days` before the
+    range to catch the ones that began earlier and are still running.
+    """
+
+    __slots__ = ("version", "holidays", "starts", "max_days")
+
+    def __init__(self, version: int, holidays: List[Holiday]):
+        self.version = version
+        holidays.sort(key=lambda holiday: (holiday.start, holiday.title))
+        self.holidays = holidays
+        self.starts = [holiday.start for holiday in holidays]
+        self.max_days = max(((holiday.end - holiday.start).days for holiday in holidays), default=1)
+
+    def query(self, start: Optional[date] = None, end: Optional[date] = None, limit: Optional[int] = None) -> List[Holiday]:
+        """Holidays overlapping `start` to `end` (inclusive; None leaves that side open)"""
+        low = 0 if start is None else bisect.bisect_left(self.starts, start - timedelta(days=self.max_days))
+        high = len(self.starts) if end is None else bisect.bisect_right(self.starts, end, low)
+        matches = []
+        for holiday in self.holidays[low:high]:
+            if start is None or holiday.end > start:
+                matches.append(holiday)
+                if len(matches) == limit:
+                    break
+        return matches
+
+
+# Parsed sources, reparsed when their file changes
+_indexes: Dict[str, HolidayIndex] = {}
+_parse_lock = threading.Lock()
+
+
+def _source_path(source: str) -> str:
+    if not re.match(SOURCE_PATTERN, source):
+        raise HTTPException(status_code=400, detail="Invalid calendar source name")
+    path = os.path.join(CALENDAR_DIR, f"{source}.ics")
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail=f"Unknown calendar source: {source}")
+    return path
+
+
+def holiday_index(source: str) -> HolidayIndex:
+    """
+    Get the index of a source, parsing its file on first use and again only
+    when its modification time changes.
+    """
+    path = _source_path(source)
+    version = os.stat(path).st_mtime_ns
+    index = _indexes.get(source)
+    if index is not None and index.version == version:
+        return index
+    with _parse_lock:
+        index = _indexes.get(source)
+        if index is None or index.version != version:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    holidays = parse_ics(f.read(), source)
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"Error reading calendar {source}: {e}")
+                raise HTTPException(status_code=500, detail=f"Calendar {source} could not be read")
+            index = _indexes[source] = HolidayIndex(version, holidays)
+    return index
+
+
+def load_default():
+    """Parse the default source ahead of the first request (run at startup)"""
+    try:
+        holiday_index(DEFAULT_SOURCE)
+    except HTTPException as e:
+        print(f"Error loading calendar {DEFAULT_SOURCE}: {e.detail}")
+
+
+HOLIDAYS_ADAPTER = TypeAdapter(List[Holiday])
+
+
+def _month_range(month: str) -> Tuple[date, date]:
+    try:
+        first = datetime.strptime(month, "%Y-%m").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="month must look like 2025-05")
+    following = (first.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return first, following - timedelta(days=1)
+
+
+@router.get("/calendar", response_model=List[Holiday], tags=["calendar"])
+async def get_calendar(
+    request: Request,
+    from_day: Optional[date] = Query(None, alias="from", description="First day to include (default: no limit)"),
+    to_day: Optional[date] = Query(None, alias="to", description="Last day to include (default: no limit)"),
+    month: Optional[str] = Query(None, description="Only this month, e.g. 2025-05 (instead of from/to)"),
+    source: str = Query(DEFAULT_SOURCE, description="Calendar source, see /calendar/sources"),
+    limit: Optional[int] = Query(None, ge=1, description="Maximum number of holidays"),
+):
+    """Get the holidays of a calendar source overlapping a date range, sorted by start day"""
+    if month:
+        from_day, to_day = _month_range(month)
+    index = holiday_index(source)
+    prepared = response_cache.get(
+        ("calendar", source, from_day, to_day, limit),
+        index.version,
+        lambda: prepare(HOLIDAYS_ADAPTER, index.query(from_day, to_day, limit)),
+    )
+    return prepared.render(request)
+
+
+@router.get("/calendar/next", response_model=List[Holiday], tags=["calendar"])
+async def get_next_holidays(
+    request: Request,
+    n: int = Query(5, ge=1, le=100, description="Number of holidays"),
+    source: str = Query(DEFAULT_SOURCE, description="Calendar source, see /calendar/sources"),
+):
+    """Get the next holidays, starting with any that is running today"""
+    index = holiday_index(source)
+    today = date.today()
+    prepared = response_cache.get(
+        ("calendar_next", source, n),
+        (index.version, today),
+        lambda: prepare(HOLIDAYS_ADAPTER, index.query(today, None, n)),
+    )
+    return prepared.render(request)
+
+
+@router.get("/calendar/sources", response_model=List[CalendarSource], tags=["calendar"])
+async def get_calendar_sources():
+    """List the calendar sources available, each is parsed the first time it is requested"""
+    try:
+        names = sorted(name[:-4] for name in os.listdir(CALENDAR_DIR) if name.endswith(".ics"))
+    except OSError:
+        return []
+    sources = []
+    for name in names:
+        if not re.match(SOURCE_PATTERN, name):
+            continue
+        modified = os.stat(os.path.join(CALENDAR_DIR, f"{name}.ics")).st_mtime_ns
+        index = _indexes.get(name)
+        loaded = index is not None and index.version == modified
+        sources.append(CalendarSource(
+            name=name,
+            loaded=loaded,
+            events=len(index.holidays) if loaded else None,
+            modified=datetime.fromtimestamp(modified / 1e9),
+        ))
+    return sources
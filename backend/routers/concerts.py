@@ -1,31 +1,81 @@
-from typing import List, Optional
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from datetime import datetime, timedelta
-from cachetools import TTLCache, cached
+from typing import Callable, Dict, List, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Query, Request
+from pydantic import BaseModel, TypeAdapter
+from datetime import date, datetime, timedelta
+from datetime import time as dtime
 from cachetools.keys import hashkey
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+import bisect
+import hashlib
+import os
+import time
+import httpx
+from bs4 import BeautifulSoup, SoupStrainer
 import re
+from core.cache import CacheResult, DerivedCache, StaleCache, cached
+from core.responses import prepare, response_cache
+from core import http_client
+from core.resilience import UpstreamError, call_with_retry
 
 router = APIRouter()
 
+_current_dir = os.path.dirname(os.path.abspath(__file__))
+
 # Cache for 1 hour since concert schedules don't change frequently
-cache_hour = TTLCache(maxsize=1024, ttl=timedelta(hours=1), timer=datetime.now)
+# (each configured venue gets its refresh interval plus VENUE_TTL_MARGIN instead, see load_venues)
+cache_hour = StaleCache("concerts", maxsize=1024, ttl=timedelta(hours=1), refetch_cost=timedelta(minutes=30))
+# Default background refresh, a little before the cache entries expire
+REFRESH_INTERVAL = timedelta(minutes=55)
+# How long past its refresh interval a venue's entry stays fresh, so the scheduled refresh lands first
+VENUE_TTL_MARGIN = timedelta(minutes=5)
+
+# JSON list of venues, see venues.json. CONCERT_VENUES holds the same list inline and takes precedence.
+VENUES_FILE = os.getenv("CONCERT_VENUES_FILE", os.path.join(os.path.dirname(_current_dir), "venues.json"))
+# Venue pages fetched and parsed at the same time
+VENUE_MAX_CONCURRENCY = int(os.getenv("CONCERT_MAX_CONCURRENCY", 4))
+_venue_slots = asyncio.Semaphore(VENUE_MAX_CONCURRENCY)
 
 
 class ConcertEvent(BaseModel):
-    date: str
+    date: str  # As listed by the venue, e.g. "Viernes 14 noviembre 2025"
     description: str
     venue: str
     time: Optional[str] = None
     cost: Optional[str] = None
+    day: Optional[date] = None  # None when the listed date could not be parsed
+    start_time: Optional[dtime] = None
+    price: Optional[float] = None  # In euros
 
 
 class ConcertsResponse(BaseModel):
     concerts: List[ConcertEvent]
 
 
+class Venue(BaseModel):
+    name: str
+    url: str
+    parser: str = "onsevilla"
+    refresh_minutes: int = int(REFRESH_INTERVAL.total_seconds() // 60)
+    
+    @property
+    def refresh_interval(self) -> timedelta:
+        return timedelta(minutes=self.refresh_minutes)
+
+
+class VenueStatus(BaseModel):
+    name: str
+    url: str
+    parser: str
+    refresh_minutes: int
+    fetches: int = 0
+    not_modified: int = 0
+    unchanged: int = 0
+    parses: int = 0
+    last_success: Optional[datetime] = None
+    last_error: Optional[str] = None
+    parse_seconds: Optional[float] = None
+
+
 def custom_hashkey(*args, **kwargs):
     """Custom hash key for caching that ignores self parameter"""
     return hashkey(*args, **kwargs)
@@ -70,14 +120,67 @@ def extract_time_and_cost(description: str) -> tuple[Optional[str], Optional[str
     return time, cost, cleaned_description
 
 
+class PageState:
+    """What is known about a venue page since its last successful scrape"""
+    
+    __slots__ = ("etag", "last_modified", "digest", "events")
+    
+    def __init__(self, etag: Optional[str], last_modified: Optional[str], digest: str, events: List[dict]):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.digest = digest
+        self.events = events
+
+
+# Keyed by URL, used to send conditional requests and skip unchanged pages (an evicted page is downloaded and parsed again)
+_page_states = DerivedCache("page_states", maxsize=256, refetch_cost=timedelta(minutes=30))
+
+# Per-venue scrape counters and timings, reported by /concerts/venues
+SCRAPE_STATS: Dict[str, dict] = {}
+
+
+def _venue_stats(venue: str) -> dict:
+    stats = SCRAPE_STATS.get(venue)
+    if stats is None:
+        stats = SCRAPE_STATS[venue] = {
+            "fetches": 0, "not_modified": 0, "unchanged": 0, "parses": 0,
+            "last_success": None, "last_error": None, "parse_seconds": None,
+        }
+    return stats
+
+
+_PROGRAMACION_MARKER = re.compile(rb"""name=["']?programacion""")
+
+
+def programacion_digest(content: bytes) -> str:
+    """
+    Hash the programacion section of a venue page.
+    
+    Only the part from the programacion anchor up to the footer is hashed, so
+    menus, banners and other page furniture that change on every load do not
+    count as a change of the programme.
+    """
+    match = _PROGRAMACION_MARKER.search(content)
+    start = match.start() if match else 0
+    end = content.find(b"<footer", start)
+    section = content[start:] if end == -1 else content[start:end]
+    return hashlib.blake2b(section, digest_size=16).hexdigest()
+
+
 @cached(cache_hour, key=custom_hashkey)
-def scrape_concerts(url: str, venue: str) -> List[dict]:
+async def scrape_concerts(url: str, venue: str, parser: str = "onsevilla") -> List[dict]:
     """
-    Scrape concert events from OnSevilla website.
+    Scrape concert events from a venue page.
+    
+    The page is requested conditionally (If-None-Match / If-Modified-Since) and
+    only parsed when its programacion section changed since the last scrape,
+    otherwise the previous events are reused. At most VENUE_MAX_CONCURRENCY
+    venues are scraped at the same time.
     
     Args:
         url: The URL to scrape concert information from
         venue: The name of the venue
+        parser: Name of the page parser in PARSERS
         
     Returns:
         List of dictionaries containing date, description, and venue of events
@@ -85,17 +188,96 @@ def scrape_concerts(url: str, venue: str) -> List[dict]:
     Raises:
         HTTPException: If the request fails or parsing encounters an error
     """
+    stats = _venue_stats(venue)
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-    except requests.RequestException as e:
+        async with _venue_slots:
+            events = await _scrape_page(url, PARSERS[parser], stats)
+    except HTTPException as e:
+        stats["last_error"] = str(e.detail)
+        raise
+    stats["last_success"] = datetime.now()
+    stats["last_error"] = None
+    return events
+
+
+async def _scrape_page(url: str, parse: Callable[[bytes], List[dict]], stats: dict) -> List[dict]:
+    state = _page_states.get(url)
+    headers = {}
+    if state is not None:
+        if state.etag:
+            headers["If-None-Match"] = state.etag
+        if state.last_modified:
+            headers["If-Modified-Since"] = state.last_modified
+
+    async def fetch():
+        response = await http_client.get(url, headers=headers, timeout=10)
+        if response.status_code != 304:
+            response.raise_for_status()
+        return response
+
+    try:
+        response = await call_with_retry("onsevilla", fetch, max_retries=2)
+    except (httpx.HTTPError, UpstreamError) as e:
         raise HTTPException(status_code=502, detail=f"Failed to fetch concert data: {str(e)}")
+    stats["fetches"] += 1
+    
+    if response.status_code == 304 and state is not None:
+        stats["not_modified"] += 1
+        return state.events
+    
+    digest = programacion_digest(response.content)
+    if state is not None and state.digest == digest:
+        stats["unchanged"] += 1
+        events = state.events
+    else:
+        stats["parses"] += 1
+        started = time.perf_counter()
+        # Parsing is CPU bound, keep it off the event loop
+        events = await asyncio.to_thread(parse, response.content)
+        stats["parse_seconds"] = round(time.perf_counter() - started, 4)
     
+    _page_states.set(url, PageState(
+        response.headers.get("etag"), response.headers.get("last-modified"), digest, events
+    ))
+    return events
+
+
+# Dates look like "Viernes 14 noviembre 2025", any Spanish month name marks a date
+_SPANISH_MONTH_PATTERN = re.compile(
+    "enero|febrero|marzo|abril|mayo|junio|julio|agosto|septiembre|octubre|noviembre|diciembre"
+)
+
+
+# The WordPress content block of OnSevilla pages, where the programacion anchor lives
+_PROGRAMACION_CONTAINER = SoupStrainer("div", class_="entry-content")
+
+
+def parse_programacion(content: bytes) -> List[dict]:
+    """
+    Extract the events listed in the programacion section of an OnSevilla venue page.
+    
+    Only the page's content block is turned into a BeautifulSoup tree (see
+    _PROGRAMACION_CONTAINER), which is much cheaper than building a tree of
+    the whole page with its menus and banners. Pages without that block are
+    parsed whole.
+    
+    Args:
+        content: The raw HTML of the venue page
+        
+    Returns:
+        List of dictionaries containing date and description of events
+        
+    Raises:
+        HTTPException: If the page cannot be parsed
+    """
     try:
-        soup = BeautifulSoup(response.content, "html.parser")
+        soup = BeautifulSoup(content, "html.parser", parse_only=_PROGRAMACION_CONTAINER)
+        programacion_anchor = soup.find("a", {"name": "programacion"})
+        if programacion_anchor is None:
+            soup = BeautifulSoup(content, "html.parser")
+            programacion_anchor = soup.find("a", {"name": "programacion"})
         
         # The main div that contains the programacion
-        programacion_anchor = soup.find("a", {"name": "programacion"})
         if not programacion_anchor:
             raise HTTPException(status_code=404, detail="Programacion section not found on page")
         
@@ -104,143 +286,362 @@ def scrape_concerts(url: str, venue: str) -> List[dict]:
         if not parent_container:
             raise HTTPException(status_code=404, detail="Parent container not found on page")
         
-        events = []
-        
-        # Spanish months for date detection
-        spanish_months = [
-            "enero", "febrero", "marzo", "abril", "mayo", "junio",
-            "julio", "agosto", "septiembre", "octubre", "noviembre", "diciembre"
-        ]
-        
-        # Traverse all descendants to find dates and their associated events
-        for element in parent_container.descendants:
-            if element.name == "strong":
-                text = element.get_text(strip=True)
-                # Check if it's a date (format: day + month + year)
-                if any(month in text.lower() for month in spanish_months):
-                    current_date = text
-                    
-                    # Look for the event description in the next sibling
-                    next_sibling = element.next_sibling
-                    attempts = 0
-                    while next_sibling and attempts < 10:
-                        if isinstance(next_sibling, str):
-                            desc = next_sibling.strip()
-                            if desc.startswith("·"):
-                                # Remove leading dot and whitespace
-                                desc = desc[1:].strip()
-                                if desc:
-                                    events.append({
-                                        "date": current_date,
-                                        "description": desc
-                                    })
-                                    break
-                        elif next_sibling.name == "strong":
-                            # Next date found, stop looking
-                            break
-                        
-                        next_sibling = next_sibling.next_sibling
-                        attempts += 1
-        
-        return events
+        return extract_events(parent_container)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error parsing concert data: {str(e)}")
 
 
+def extract_events(parent_container) -> List[dict]:
+    """
+    Collect the (date, description) pairs under the programacion container.
+    
+    Args:
+        parent_container: The BeautifulSoup element holding the programacion anchor
+        
+    Returns:
+        List of dictionaries containing date and description of events
+    """
+    events = []
+    
+    # Traverse all descendants to find dates and their associated events
+    for element in parent_container.descendants:
+        if element.name == "strong":
+            text = element.get_text(strip=True)
+            # Check if it's a date (format: day + month + year)
+            if _SPANISH_MONTH_PATTERN.search(text.lower()):
+                current_date = text
+                
+                # Look for the event description in the next sibling
+                next_sibling = element.next_sibling
+                attempts = 0
+                while next_sibling and attempts < 10:
+                    if isinstance(next_sibling, str):
+                        desc = next_sibling.strip()
+                        if desc.startswith("·"):
+                            # Remove leading dot and whitespace
+                            desc = desc[1:].strip()
+                            if desc:
+                                events.append({
+                                    "date": current_date,
+                                    "description": desc
+                                })
+                                break
+                    elif next_sibling.name == "strong":
+                        # Next date found, stop looking
+                        break
+                    
+                    next_sibling = next_sibling.next_sibling
+                    attempts += 1
+    
+    return events
+
+
+# Page parsers venues can use, by the name given in the venue config
+PARSERS: Dict[str, Callable[[bytes], List[dict]]] = {
+    "onsevilla": parse_programacion,
+}
+
+
+def load_venues() -> List[Venue]:
+    """
+    Read the venue registry from CONCERT_VENUES, or else from VENUES_FILE.
+    
+    Raises:
+        ValueError: If the config is invalid, names a parser that does not exist
+            or lists a venue twice
+    """
+    raw = os.getenv("CONCERT_VENUES")
+    if not raw:
+        with open(VENUES_FILE, encoding="utf-8") as f:
+            raw = f.read()
+    venues = TypeAdapter(List[Venue]).validate_json(raw)
+    names = set()
+    for venue in venues:
+        if venue.parser not in PARSERS:
+            raise ValueError(f"Unknown parser '{venue.parser}' for venue {venue.name}")
+        if venue.name in names:
+            raise ValueError(f"Venue {venue.name} is configured twice")
+        names.add(venue.name)
+    return venues
+
+
+VENUES = load_venues()
+for _venue in VENUES:
+    # Entries expire just after the venue's own refresh, not after the cache's fixed hour
+    cache_hour.set_ttl(scrape_concerts.cache_key(_venue.url, _venue.name, _venue.parser), _venue.refresh_interval + VENUE_TTL_MARGIN)
+
+
+async def refresh_venue(venue: Venue):
+    """Re-scrape one venue into the cache (run by the background scheduler on the venue's interval)"""
+    await scrape_concerts.refresh(venue.url, venue.name, venue.parser)
+
+
+# Response bodies are validated and serialized once per refresh, see core.responses
+CONCERTS_ADAPTER = TypeAdapter(ConcertsResponse)
+
+
 @router.get("/concerts", response_model=ConcertsResponse)
-async def get_concerts():
+async def get_concerts(
+    request: Request,
+    from_day: Optional[date] = Query(None, alias="from", description="First day to include (default: yesterday)"),
+    to_day: Optional[date] = Query(None, alias="to", description="Last day to include (default: no limit)"),
+    venue: Optional[str] = Query(None, description="Only concerts at this venue"),
+    limit: Optional[int] = Query(None, ge=1, description="Maximum number of concerts"),
+):
     """
     Get the list of upcoming concerts from multiple venues in Sevilla.
     
+    Concerts whose date could not be parsed are listed last, and only when
+    no `to` day is given.
+    
     Returns:
-        ConcertsResponse: Flat list of all concerts with venue information
-    """
-    venues_config = [
-        {
-            "name": "Sala X",
-            "url": "https://onsevilla.com/programacion-sala-x-sevilla"
-        },
-        {
-            "name": "Sala Even",
-            "url": "https://onsevilla.com/programacion-sala-even-sevilla"
-        }
+        ConcertsResponse: Flat list of all concerts with venue information, sorted by date
+    """
+    venue_results = await lookup_venues()
+    index = concert_index(venue_results)
+    start = from_day or _yesterday()
+    prepared = response_cache.get(
+        ("concerts", start, to_day, venue, limit),
+        index.version,
+        lambda: prepare(CONCERTS_ADAPTER, ConcertsResponse(concerts=index.query(start, to_day, venue, limit))),
+    )
+    return prepared.render(request, *(result for _, result in venue_results))
+
+
+@router.get("/concerts/venues", response_model=List[VenueStatus])
+async def get_venues():
+    """
+    Get the configuration, scrape counters and timings of each venue.
+    
+    - **last_success**: When the venue was last scraped successfully
+    - **last_error**: Why the last scrape failed, if it did
+    - **parse_seconds**: How long the last parse of the page took
+    - **fetches**: Requests made to the venue page
+    - **not_modified**: Fetches answered with 304, nothing downloaded or parsed
+    - **unchanged**: Fetches whose programacion section had not changed, parse skipped
+    - **parses**: Fetches that had to be parsed
+    """
+    return [
+        VenueStatus(
+            name=venue.name,
+            url=venue.url,
+            parser=venue.parser,
+            refresh_minutes=venue.refresh_minutes,
+            **SCRAPE_STATS.get(venue.name, {}),
+        )
+        for venue in VENUES
     ]
+
+
+async def load_concerts() -> Tuple[List[ConcertEvent], List[CacheResult]]:
+    """
+    Collect the upcoming concerts of every venue, sorted by date.
     
-    all_concerts = []
+    Returns:
+        Tuple of (concerts, cache results they were built from)
+    """
+    venue_results = await lookup_venues()
+    return concert_index(venue_results).query(_yesterday()), [result for _, result in venue_results]
+
+
+async def lookup_venues() -> List[Tuple[str, CacheResult]]:
+    """
+    Look up the cached events of every venue concurrently, skipping venues that fail.
     
-    for venue_config in venues_config:
-        venue_name = venue_config["name"]
-        url = venue_config["url"]
+    Returns:
+        List of (venue name, cache result) tuples
+    """
+    # Scrape all venues concurrently, up to VENUE_MAX_CONCURRENCY at a time
+    lookups = await asyncio.gather(
+        *(scrape_concerts.lookup(venue.url, venue.name, venue.parser) for venue in VENUES),
+        return_exceptions=True,
+    )
+    
+    venue_results = []
+    for venue, result in zip(VENUES, lookups):
+        venue_name = venue.name
         
-        try:
-            events = scrape_concerts(url, venue_name)
-            # Add venue name to each event and append to the flat list
-            for event in events:
-                # Extract time and cost from description
-                time, cost, cleaned_description = extract_time_and_cost(event["description"])
-                
-                all_concerts.append(ConcertEvent(
-                    date=event["date"],
-                    description=cleaned_description,
-                    venue=venue_name,
-                    time=time,
-                    cost=cost
-                ))
-        except HTTPException as e:
+        if isinstance(result, HTTPException):
             # Log the error but continue with other venues
-            print(f"Error scraping {venue_name}: {e.detail}")
+            print(f"Error scraping {venue_name}: {result.detail}")
             continue
-    
-    # Parse and filter concerts by date
-    def parse_spanish_date(date_str: str) -> datetime:
-        """Parse Spanish date format like 'Viernes 1 noviembre 2024' or '1 noviembre 2024'"""
-        spanish_months = {
-            "enero": 1, "febrero": 2, "marzo": 3, "abril": 4,
-            "mayo": 5, "junio": 6, "julio": 7, "agosto": 8,
-            "septiembre": 9, "octubre": 10, "noviembre": 11, "diciembre": 12
-        }
-        
-        # Remove day of week if present (e.g., "Viernes ")
-        parts = date_str.lower().split()
-        
-        # Find day, month, and year
-        day = None
-        month = None
-        year = None
+        if isinstance(result, Exception):
+            raise result
         
-        for part in parts:
-            # Check if it's a number (day or year)
-            if part.isdigit():
-                num = int(part)
-                if num > 31:  # It's a year
-                    year = num
-                elif day is None:  # It's a day
-                    day = num
-            # Check if it's a month
-            elif part in spanish_months:
-                month = spanish_months[part]
+        venue_results.append((venue_name, result))
+    return venue_results
+
+
+SPANISH_MONTHS = {
+    "enero": 1, "febrero": 2, "marzo": 3, "abril": 4,
+    "mayo": 5, "junio": 6, "julio": 7, "agosto": 8,
+    "septiembre": 9, "octubre": 10, "noviembre": 11, "diciembre": 12
+}
+
+
+def parse_spanish_date(date_str: str, default_year: int) -> Optional[date]:
+    """
+    Parse Spanish date format like 'Viernes 1 noviembre 2024' or '1 noviembre 2024'.
+    
+    Args:
+        date_str: The date as listed by the venue
+        default_year: Year to use when the date does not have one
         
-        # Default to current year if not specified
-        if year is None:
-            year = datetime.now().year
+    Returns:
+        The date, or None if it cannot be parsed
+    """
+    # The day of week (e.g., "Viernes ") is simply skipped
+    day = None
+    month = None
+    year = None
+    
+    for part in date_str.lower().split():
+        # Check if it's a number (day or year)
+        if part.isdigit():
+            num = int(part)
+            if num > 31:  # It's a year
+                year = num
+            elif day is None:  # It's a day
+                day = num
+        # Check if it's a month
+        elif part in SPANISH_MONTHS:
+            month = SPANISH_MONTHS[part]
+    
+    if not (day and month):
+        return None
+    try:
+        return date(year or default_year, month, day)
+    except ValueError:
+        # e.g. "30 febrero"
+        return None
+
+
+def parse_start_time(text: Optional[str]) -> Optional[dtime]:
+    """Turn "21" or "20:30" (as found before "horas") into a time"""
+    if not text:
+        return None
+    hours, _, minutes = text.partition(":")
+    try:
+        return dtime(int(hours), int(minutes or 0))
+    except ValueError:
+        return None
+
+
+def parse_price(text: Optional[str]) -> Optional[float]:
+    """Turn "15", "15,50" or "15.50" (as found before "euros") into a number"""
+    if not text:
+        return None
+    return float(text.replace(",", "."))
+
+
+def normalize_events(venue_name: str, events: List[dict], default_year: int) -> List[ConcertEvent]:
+    """
+    Turn the events scraped from a venue into typed concerts.
+    
+    Args:
+        venue_name: The name of the venue
+        events: The scraped (date, description) events
+        default_year: Year for dates listed without one
         
-        if day and month:
-            return datetime(year, month, day)
-        else:
-            # If parsing fails, return a far future date to put it at the end
-            return datetime(9999, 12, 31)
-    
-    # Get yesterday's date (start of yesterday)
-    yesterday = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
-    
-    # Filter out concerts that have already passed (before yesterday)
-    upcoming_concerts = [
-        concert for concert in all_concerts
-        if parse_spanish_date(concert.date) >= yesterday
-    ]
+    Returns:
+        List of concerts in page order
+    """
+    concerts = []
+    for event in events:
+        # Extract time and cost from description
+        time, cost, cleaned_description = extract_time_and_cost(event["description"])
+        concerts.append(ConcertEvent(
+            date=event["date"],
+            description=cleaned_description,
+            venue=venue_name,
+            time=time,
+            cost=cost,
+            day=parse_spanish_date(event["date"], default_year),
+            start_time=parse_start_time(time),
+            price=parse_price(cost),
+        ))
+    return concerts
+
+
+class ConcertIndex:
+    """
+    Concerts of every venue sorted by day, for date-range lookups with bisect.
     
-    # Sort concerts by date
-    upcoming_concerts.sort(key=lambda concert: parse_spanish_date(concert.date))
+    Concerts without a usable date sort last.
+    """
+    
+    __slots__ = ("version", "concerts", "days")
+    
+    def __init__(self, version: tuple, concerts: List[ConcertEvent]):
+        self.version = version
+        # Stable sort: same-day concerts keep venue and page order
+        concerts.sort(key=_index_day)
+        self.concerts = concerts
+        self.days = [_index_day(concert) for concert in concerts]
+    
+    def query(
+        self,
+        start: date,
+        end: Optional[date] = None,
+        venue: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[ConcertEvent]:
+        """
+        Concerts from `start` to `end` (inclusive; no end means everything
+        after `start`, including undated concerts), optionally of one venue.
+        """
+        low = bisect.bisect_left(self.days, start)
+        high = bisect.bisect_right(self.days, end, low) if end else len(self.days)
+        if venue is None:
+            return self.concerts[low:high] if limit is None else self.concerts[low:min(high, low + limit)]
+        matches = []
+        for concert in self.concerts[low:high]:
+            if concert.venue == venue:
+                matches.append(concert)
+                if len(matches) == limit:
+                    break
+        return matches
+
+
+def _index_day(concert: ConcertEvent) -> date:
+    return concert.day or date.max
+
+
+def _yesterday() -> date:
+    # Concerts from yesterday are kept, late shows run past midnight
+    return date.today() - timedelta(days=1)
+
+
+# Normalized events per venue with the (fetched_at, year) they were built for, and the last index
+_normalized = DerivedCache("concert_events", maxsize=256)
+_index: Optional[ConcertIndex] = None
+
+
+def concert_index(venue_results: List[Tuple[str, CacheResult]]) -> ConcertIndex:
+    """
+    Get the index of the given venue results, normalizing each venue's events
+    only when they were refetched.
+    
+    Args:
+        venue_results: List of (venue name, cache result) tuples from lookup_venues
+        
+    Returns:
+        The ConcertIndex, rebuilt only when a venue's events or the year changed
+    """
+    global _index
+    default_year = date.today().year
+    version = (tuple((venue, result.fetched_at) for venue, result in venue_results), default_year)
+    if _index is not None and _index.version == version:
+        return _index
     
-    return ConcertsResponse(concerts=upcoming_concerts)
+    concerts = []
+    for venue_name, result in venue_results:
+        built_for = (result.fetched_at, default_year)
+        normalized = _normalized.get(venue_name)
+        if normalized is None or normalized[0] != built_for:
+            normalized = (built_for, normalize_events(venue_name, result.value, default_year))
+            _normalized.set(venue_name, normalized)
+        concerts.extend(normalized[1])
+    _index = ConcertIndex(version, concerts)
+    return _index
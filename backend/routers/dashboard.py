@@ -0,0 +1,118 @@
+import asyncio
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel
+from core.cache import CacheResult
+from routers import weather, concerts, news
+from routers.weather import CurrentWeatherResponse, DailyForecastResponse, DailyWeatherCard
+from routers.concerts import ConcertEvent
+from routers.news import Article
+
+router = APIRouter()
+
+T = TypeVar("T")
+
+SECTIONS = ["weather", "current", "daily", "concerts", "news"]
+
+
+class DashboardSection(BaseModel, Generic[T]):
+    status: str  # "ok", "stale" (served from an expired cache entry) or "error"
+    age: Optional[int] = None
+    error: Optional[str] = None
+    data: Optional[T] = None
+
+
+class DashboardResponse(BaseModel):
+    weather: Optional[DashboardSection[List[DailyForecastResponse]]] = None
+    current: Optional[DashboardSection[CurrentWeatherResponse]] = None
+    daily: Optional[DashboardSection[List[DailyWeatherCard]]] = None
+    concerts: Optional[DashboardSection[List[ConcertEvent]]] = None
+    news: Optional[DashboardSection[Dict[str, List[Article]]]] = None
+
+
+async def _load_weather(municipio: str) -> Tuple[Any, List[CacheResult]]:
+    result = await weather.get_weather_aemet_horaria.lookup(municipio)
+    return result.value, [result]
+
+
+async def _load_current(municipio: str) -> Tuple[Any, List[CacheResult]]:
+    result = await weather.get_weather_aemet_horaria.lookup(municipio)
+    return weather.build_current_weather(weather.hourly_table(municipio, result)), [result]
+
+
+async def _load_daily(municipio: str) -> Tuple[Any, List[CacheResult]]:
+    result = await weather.get_weather_aemet_diaria.lookup(municipio)
+    return result.value, [result]
+
+
+async def _load_concerts() -> Tuple[Any, List[CacheResult]]:
+    concert_list, cache_results = await concerts.load_concerts()
+    # /concerts quietly skips broken venues; here a section with no working venue is an error
+    if not cache_results and concerts.VENUES:
+        raise HTTPException(status_code=502, detail="No venue could be scraped")
+    return concert_list, cache_results
+
+
+async def _load_news() -> Tuple[Any, List[CacheResult]]:
+    """Fetch the dashboard's news sections, leaving out the ones that fail"""
+    results, errors = await news.lookup_sections(news.DASHBOARD_SECTIONS)
+    if not results and errors:
+        raise next(iter(errors.values()))
+    return news.group_articles(results, news.DASHBOARD_PAGE_SIZE), list(results.values())
+
+
+Loader = Callable[[], Awaitable[Tuple[Any, List[CacheResult]]]]
+
+
+def _loaders(municipio: str) -> Dict[str, Loader]:
+    return {
+        "weather": partial(_load_weather, municipio),
+        "current": partial(_load_current, municipio),
+        "daily": partial(_load_daily, municipio),
+        "concerts": _load_concerts,
+        "news": _load_news,
+    }
+
+
+async def _load_section(loader: Loader) -> DashboardSection:
+    """Run one section's loader, turning a failure into an error section"""
+    try:
+        data, cache_results = await loader()
+    except HTTPException as e:
+        return DashboardSection(status="error", error=str(e.detail))
+    except Exception as e:
+        return DashboardSection(status="error", error=str(e) or type(e).__name__)
+    stale = any(result.stale for result in cache_results)
+    age = int(max((result.age for result in cache_results), default=0))
+    return DashboardSection(status="stale" if stale else "ok", age=age, data=data)
+
+
+@router.get("/dashboard", response_model=DashboardResponse, tags=["dashboard"])
+async def get_dashboard(
+    sections: Optional[str] = Query(
+        None,
+        description=f"Comma-separated sections to include ({', '.join(SECTIONS)}). Default: all",
+    ),
+    municipio: weather.Municipio = weather.DEFAULT_MUNICIPIO,
+):
+    """
+    Get every dashboard widget's data in one response.
+
+    Sections are gathered concurrently. Each one carries its own status, so a
+    failing upstream only degrades its own section:
+
+    - **status**: ok, stale (served from an expired cache entry) or error
+    - **age**: Age in seconds of the oldest cached data the section was built from
+    - **error**: Why the section could not be loaded
+    """
+    requested = SECTIONS
+    if sections:
+        requested = [name.strip() for name in sections.split(",") if name.strip()]
+        unknown = [name for name in requested if name not in SECTIONS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown sections: {', '.join(unknown)}")
+
+    loaders = _loaders(municipio)
+    loaded = await asyncio.gather(*(_load_section(loaders[name]) for name in requested))
+    return DashboardResponse(**dict(zip(requested, loaded)))
@@ -0,0 +1,53 @@
+import json
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from core.events import HEARTBEAT_INTERVAL, TooManySubscribersError, feed
+
+router = APIRouter()
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+@router.get("/events/stream", tags=["events"])
+async def stream_events(request: Request):
+    """
+    Server-Sent Events stream announcing data changes, instead of polling every endpoint.
+
+    - **hello**: Sent on connect with the current version of every source
+    - **change**: `{"source", "version", "key"}` when a cache entry's data
+      changed after a refresh (source is weather, concerts, articles or news;
+      key identifies the entry, e.g. the municipio). Refetch the matching
+      endpoint when it arrives.
+
+    Versions are the fetch time in milliseconds of the source's newest data,
+    the same in every uvicorn worker.
+
+    A comment line is sent every SSE_HEARTBEAT_SECONDS to keep idle
+    connections open. Returns 503 when SSE_MAX_CONNECTIONS streams are open
+    on the worker that took the connection.
+    """
+    try:
+        subscriber = feed.subscribe()
+    except TooManySubscribersError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(HEARTBEAT_INTERVAL))})
+
+    async def stream():
+        try:
+            yield _sse("hello", {"versions": feed.versions})
+            while not await request.is_disconnected():
+                changes = await subscriber.next_changes(HEARTBEAT_INTERVAL)
+                if not changes:
+                    yield ": heartbeat\n\n"
+                for change in changes:
+                    yield _sse("change", change)
+        finally:
+            feed.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        # No buffering by nginx or other proxies, events must go out as they happen
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,13 +1,19 @@
 import os
 import random
-from typing import List, Optional
-from datetime import datetime, timedelta
-from fastapi import APIRouter, HTTPException, Query
-from pydantic import BaseModel
-from cachetools import TTLCache, cached
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, HTTPException, Query, Request
+from pydantic import BaseModel, TypeAdapter
 from cachetools.keys import hashkey
-import requests
+import asyncio
+import httpx
+from urllib.parse import urlsplit
 from dotenv import load_dotenv
+from core.cache import CacheResult, StaleCache, cached
+from core.responses import prepare, response_cache
+from core import http_client, quota
+from core.quota import QuotaExceededError
+from core.resilience import UpstreamError, call_with_retry
 
 load_dotenv()
 GUARDIAN_API_KEY = os.getenv("GUARDIAN_API_KEY")
@@ -15,10 +21,47 @@ GUARDIAN_API_KEY = os.getenv("GUARDIAN_API_KEY")
 
 router = APIRouter()
 
-# Cache for 30 minutes since news updates frequently
-cache_30min = TTLCache(maxsize=1024, ttl=timedelta(minutes=30), timer=datetime.now)
+# Cache for 30 minutes since news updates frequently (searches only, sections come from the article store)
+# Not persisted: every distinct query would get its own row in the snapshot file
+cache_30min = StaleCache("news", maxsize=1024, ttl=timedelta(minutes=30), persistent=False)
+# Articles of each section, newest first, topped up incrementally every hour
+# Built up over many syncs, so kept longer than search results under memory pressure
+articles_cache = StaleCache("articles", maxsize=64, ttl=timedelta(minutes=65), refetch_cost=timedelta(minutes=10))
+# Refreshed in the background a little before the cache entries expire. One call per dashboard
+# section and sync, so hourly syncs use about 200 of the 500 daily Guardian calls
+REFRESH_INTERVAL = timedelta(minutes=60)
 
-BASE_URL = "https://content.guardianapis.com"
+# Sections requested by the dashboard (NewsList.jsx), kept warm by the scheduler
+DASHBOARD_SECTIONS = [
+    "education",
+    "culture",
+    "politics",
+    "society",
+    "world",
+    "environment",
+    "science",
+    "technology",
+]
+DASHBOARD_PAGE_SIZE = 15
+# Most sections one /news/batch request may ask for
+MAX_BATCH_SECTIONS = 20
+
+# Articles older than this, or past the newest MAX_ARTICLES of a section, are dropped from the store
+MAX_ARTICLE_AGE = timedelta(days=int(os.getenv("NEWS_MAX_AGE_DAYS", 7)))
+MAX_ARTICLES = int(os.getenv("NEWS_MAX_ARTICLES", 200))
+# Page size and number of pages asked for in one incremental sync
+SYNC_PAGE_SIZE = 50
+SYNC_MAX_PAGES = 4
+
+# Overridable to point at a stand-in server (see benchmarks/)
+BASE_URL = os.getenv("GUARDIAN_BASE_URL", "https://content.guardianapis.com")
+# Guardian developer keys: 1 call a second and 500 a day
+quota.register(
+    "guardian",
+    urlsplit(BASE_URL).netloc,
+    per_minute=float(os.getenv("GUARDIAN_RATE_PER_MINUTE", 60)),
+    per_day=int(os.getenv("GUARDIAN_DAILY_QUOTA", 500)),
+)
 
 
 class Article(BaseModel):
@@ -35,13 +78,18 @@ class NewsResponse(BaseModel):
     section: Optional[str] = None
 
 
+class NewsBatchResponse(BaseModel):
+    sections: Dict[str, List[Article]]
+    errors: Dict[str, str] = {}
+
+
 def custom_hashkey(*args, **kwargs):
     """Custom hash key for caching"""
     return hashkey(*args, **kwargs)
 
 
 @cached(cache_30min, key=custom_hashkey)
-def fetch_guardian_news(
+async def fetch_guardian_news(
     section: Optional[str] = None,
     query: Optional[str] = None,
     page: int = 1,
@@ -79,18 +127,171 @@ def fetch_guardian_news(
     if query:
         params["q"] = query
 
-    try:
-        response = requests.get(endpoint, params=params, timeout=10)
+    async def fetch():
+        response = await http_client.get(endpoint, params=params, timeout=10)
         response.raise_for_status()
         return response.json()
-    except requests.exceptions.RequestException as e:
+
+    try:
+        return await call_with_retry("guardian", fetch, max_retries=2)
+    except QuotaExceededError as e:
+        raise HTTPException(status_code=503, detail=f"The Guardian quota is used up: {e}", headers=quota.retry_headers(e))
+    except (httpx.HTTPError, UpstreamError) as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to fetch news from The Guardian: {str(e)}"
         )
 
 
+@cached(articles_cache, key=custom_hashkey)
+async def sync_section(section: Optional[str] = None) -> List[dict]:
+    """
+    Bring the stored articles of a section up to date.
+
+    Only articles published since the newest stored one are requested
+    (`from-date`, `order-by=newest`), following pages while every article on
+    a page is new. Articles are merged by Guardian id and evicted by age.
+
+    Args:
+        section: Section ID, or None for all sections
+
+    Returns:
+        The section's articles, newest first, as Guardian results
+
+    Raises:
+        HTTPException: If the request fails
+    """
+    if not GUARDIAN_API_KEY:
+        raise HTTPException(status_code=500, detail="GUARDIAN_API_KEY not configured")
+
+    previous = articles_cache.peek(custom_hashkey(section))
+    stored = previous.value if previous is not None else []
+    known_ids = {article["id"] for article in stored}
+
+    params = {
+        "show-fields": "trailText",
+        "order-by": "newest",
+        "page-size": SYNC_PAGE_SIZE,
+        "api-key": GUARDIAN_API_KEY,
+    }
+    if section:
+        params["section"] = section
+    if stored:
+        # from-date takes a day, articles of that day already stored are skipped by id
+        params["from-date"] = stored[0]["webPublicationDate"][:10]
+
+    new_articles = []
+    for page in range(1, SYNC_MAX_PAGES + 1):
+        async def fetch(page=page):
+            response = await http_client.get(f"{BASE_URL}/search", params={**params, "page": page}, timeout=10)
+            response.raise_for_status()
+            return response.json()
+
+        try:
+            data = await call_with_retry("guardian", fetch, max_retries=2)
+        except (httpx.HTTPError, UpstreamError) as e:
+            if not new_articles and isinstance(e, QuotaExceededError):
+                raise HTTPException(
+                    status_code=503, detail=f"The Guardian quota is used up: {e}", headers=quota.retry_headers(e)
+                )
+            if not new_articles:
+                raise HTTPException(
+                    status_code=500, detail=f"Failed to fetch news from The Guardian: {str(e)}"
+                )
+            # Keep what the earlier pages brought, the rest comes next sync
+            print(f"Error fetching news for {section}, page {page}: {e}")
+            break
+
+        results = data.get("response", {}).get("results", [])
+        fresh = [_compact(article) for article in results if article.get("id") not in known_ids]
+        new_articles.extend(fresh)
+        if len(fresh) < len(results) or page >= data.get("response", {}).get("pages", 1):
+            break
+
+    cutoff = (datetime.now(timezone.utc) - MAX_ARTICLE_AGE).strftime("%Y-%m-%dT%H:%M:%SZ")
+    merged = sorted(new_articles + stored, key=lambda article: article["webPublicationDate"], reverse=True)
+    # ISO 8601 UTC timestamps compare correctly as strings
+    return [article for article in merged[:MAX_ARTICLES] if article["webPublicationDate"] >= cutoff]
+
+
+def _compact(article: dict) -> dict:
+    """Keep only the fields of a Guardian result that build_articles reads"""
+    return {
+        "id": article.get("id"),
+        "webTitle": article.get("webTitle", ""),
+        "webUrl": article.get("webUrl", ""),
+        "sectionName": article.get("sectionName"),
+        "webPublicationDate": article.get("webPublicationDate", ""),
+        "fields": {"trailText": article.get("fields", {}).get("trailText")},
+    }
+
+
+async def refresh_news():
+    """Top up the dashboard sections in the article store (run by the background scheduler)"""
+    results = await asyncio.gather(
+        *(sync_section.refresh(section) for section in DASHBOARD_SECTIONS),
+        return_exceptions=True,
+    )
+    for section, result in zip(DASHBOARD_SECTIONS, results):
+        if isinstance(result, HTTPException):
+            print(f"Error fetching news for {section}: {result.detail}")
+
+
+async def lookup_sections(sections: List[str]) -> Tuple[Dict[str, CacheResult], Dict[str, Exception]]:
+    """
+    Look up the stored articles of several sections concurrently.
+
+    Sections already stored are returned as is, only the missing ones hit
+    The Guardian, all at the same time.
+
+    Args:
+        sections: Section IDs
+
+    Returns:
+        Tuple of (cache result per section, error per section that failed)
+    """
+    lookups = await asyncio.gather(
+        *(sync_section.lookup(section) for section in sections),
+        return_exceptions=True,
+    )
+    results = {}
+    errors = {}
+    for section, result in zip(sections, lookups):
+        if isinstance(result, Exception):
+            errors[section] = result
+        else:
+            results[section] = result
+    return results, errors
+
+
+def group_articles(results: Dict[str, CacheResult], page_size: int) -> Dict[str, List[Article]]:
+    """
+    Take the newest `page_size` articles of several sections.
+
+    An article listed in more than one section is only kept in the first one.
+    """
+    seen_ids = set()
+    grouped = {}
+    for section, result in results.items():
+        articles = []
+        for article_data in result.value:
+            if article_data["id"] in seen_ids:
+                continue
+            seen_ids.add(article_data["id"])
+            articles.append(build_article(article_data))
+            if len(articles) == page_size:
+                break
+        grouped[section] = articles
+    return grouped
+
+
+# Response bodies are validated and serialized once per refresh, see core.responses
+NEWS_ADAPTER = TypeAdapter(NewsResponse)
+NEWS_BATCH_ADAPTER = TypeAdapter(NewsBatchResponse)
+
+
 @router.get("/news", response_model=NewsResponse, tags=["news"])
-def get_news(
+async def get_news(
+    request: Request,
     section: Optional[str] = Query(
         None,
         description="Section to filter by (e.g., 'culture', 'politics', 'society')",
@@ -106,30 +307,106 @@ def get_news(
     - **query**: Optional search query
     - **page**: Page number (default: 1)
     - **page_size**: Number of articles per page (default: 20, max: 50)
+
+    Without a search query, pages are served from the local article store
+    (the latest articles of the section), with no call to The Guardian per
+    page.
     """
-    data = fetch_guardian_news(section, query, page, page_size)
-    
-    articles = []
-    for article_data in data.get("response", {}).get("results", []):
-        article = Article(
-            title=article_data.get("webTitle", ""),
-            url=article_data.get("webUrl", ""),
-            summary=article_data.get("fields", {}).get("trailText"),
-            section=article_data.get("sectionName"),
-            published_date=article_data.get("webPublicationDate"),
+    if query:
+        result = await fetch_guardian_news.lookup(section, query, page, page_size)
+        build = lambda: build_news_response(
+            build_articles(result.value), result.value.get("response", {}).get("total", 0), section
         )
-        articles.append(article)
+    else:
+        result = await sync_section.lookup(section)
+        start = (page - 1) * page_size
+        build = lambda: build_news_response(
+            [build_article(article) for article in result.value[start:start + page_size]],
+            len(result.value),
+            section,
+        )
+    prepared = response_cache.get(
+        ("news", section, query, page, page_size),
+        result.fetched_at,
+        lambda: prepare(NEWS_ADAPTER, build()),
+    )
+    return prepared.render(request, result)
 
-    # Shuffle the articles
+
+@router.get("/news/batch", response_model=NewsBatchResponse, tags=["news"])
+async def get_news_batch(
+    request: Request,
+    sections: Optional[str] = Query(
+        None,
+        description=f"Comma-separated sections. Default: {','.join(DASHBOARD_SECTIONS)}",
+    ),
+    page_size: int = Query(DASHBOARD_PAGE_SIZE, ge=1, le=50, description="Number of articles per section"),
+):
+    """
+    Get the latest articles of several sections in one request.
+
+    Articles are grouped per section and deduplicated across sections.
+    Sections that could not be fetched are left out and listed in **errors**;
+    the request only fails if every section did.
+
+    - **sections**: Comma-separated section IDs (default: the dashboard's sections)
+    - **page_size**: Number of articles per section (default: 15, max: 50)
+    """
+    requested = DASHBOARD_SECTIONS
+    if sections:
+        # dict.fromkeys drops repeated sections and keeps the order
+        requested = list(dict.fromkeys(name.strip() for name in sections.split(",") if name.strip()))
+    if len(requested) > MAX_BATCH_SECTIONS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SECTIONS} sections per request")
+
+    results, errors = await lookup_sections(requested)
+    if not results and errors:
+        raise next(iter(errors.values()))
+
+    def build():
+        grouped = group_articles(results, page_size)
+        for articles in grouped.values():
+            random.shuffle(articles)
+        return prepare(NEWS_BATCH_ADAPTER, NewsBatchResponse(
+            sections=grouped,
+            errors={section: str(getattr(e, "detail", e)) for section, e in errors.items()},
+        ))
+
+    prepared = response_cache.get(
+        ("news_batch", tuple(requested), page_size),
+        (tuple(result.fetched_at for result in results.values()), tuple(errors)),
+        build,
+    )
+    return prepared.render(request, *results.values())
+
+
+def build_news_response(articles: List[Article], total: int, section: Optional[str]) -> NewsResponse:
+    # Shuffle the articles (once per refresh, the serialized response is reused until then)
     random.shuffle(articles)
 
     return NewsResponse(
         articles=articles,
-        total=data.get("response", {}).get("total", 0),
+        total=total,
         section=section,
     )
 
 
+def build_articles(data: dict) -> List[Article]:
+    """Convert a Guardian search response into articles"""
+    return [build_article(article_data) for article_data in data.get("response", {}).get("results", [])]
+
+
+def build_article(article_data: dict) -> Article:
+    """Convert one Guardian search result into an article"""
+    return Article(
+        title=article_data.get("webTitle", ""),
+        url=article_data.get("webUrl", ""),
+        summary=article_data.get("fields", {}).get("trailText"),
+        section=article_data.get("sectionName"),
+        published_date=article_data.get("webPublicationDate"),
+    )
+
+
 @router.get("/news/sections", response_model=List[str], tags=["news"])
 def get_available_sections():
     """
@@ -0,0 +1,102 @@
+from typing import Dict, List, Optional
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+from core import metrics, quota
+from core.cache import budget
+from core.responses import response_cache
+from core.resilience import BREAKERS
+
+router = APIRouter()
+
+
+class UpstreamStatus(BaseModel):
+    name: str
+    state: str
+    failures: int
+    retry_in: Optional[float] = None
+    last_error: Optional[str] = None
+
+
+@router.get("/status/upstreams", response_model=List[UpstreamStatus], tags=["status"])
+async def get_upstream_status():
+    """
+    Get the circuit breaker state of every upstream that has been called.
+
+    - **state**: closed (healthy), open (failing fast) or half_open (trying a single call)
+    - **retry_in**: Seconds until an open circuit lets a trial call through
+    """
+    return [breaker.snapshot() for breaker in BREAKERS.values()]
+
+
+class QuotaStatus(BaseModel):
+    name: str
+    host: str
+    per_minute: Optional[float] = None
+    tokens: Optional[float] = None
+    per_day: Optional[int] = None
+    used_today: Dict[str, int]
+    remaining_today: Optional[int] = None
+    refused: Dict[str, int]
+
+
+@router.get("/status/quota", response_model=List[QuotaStatus], tags=["status"])
+async def get_quota_status():
+    """
+    Get the remaining rate and daily budget of every upstream with a quota (this worker's share).
+
+    - **tokens**: Calls that can be made right now without waiting
+    - **used_today**: Calls made today, per priority
+    - **remaining_today**: Calls left today; request-driven calls stop once they have used all but QUOTA_DAILY_RESERVE of the daily quota
+    - **refused**: Calls refused so far, per priority (scheduled or on_demand)
+    """
+    return [upstream_quota.snapshot() for upstream_quota in quota.QUOTAS.values()]
+
+
+class CacheNamespaceStatus(BaseModel):
+    name: str
+    entries: int
+    maxsize: int
+    bytes: int
+    refetch_cost: Optional[float] = None
+
+
+class CacheStatus(BaseModel):
+    budget_bytes: int
+    used_bytes: int
+    namespaces: List[CacheNamespaceStatus]
+    responses: CacheNamespaceStatus
+
+
+@router.get("/status/cache", response_model=CacheStatus, tags=["status"])
+async def get_cache_status():
+    """
+    Get the estimated memory held by each cache, to tune CACHE_MAX_MB.
+
+    - **budget_bytes** / **used_bytes**: This worker's share of CACHE_MAX_MB and how much of it is used
+    - **namespaces**: Per cache, both the data caches and what is derived from them (response
+      bodies, hourly tables, concert page states and events); refetch_cost is how many seconds
+      of recency its entries are given
+    - **responses**: Serialized and compressed response bodies, also listed in namespaces
+    """
+    return CacheStatus(
+        budget_bytes=budget.max_bytes,
+        used_bytes=budget.used,
+        namespaces=[cache.stats() for cache in budget.caches],
+        responses=response_cache.stats(),
+    )
+
+
+@router.get("/metrics", response_class=PlainTextResponse, tags=["status"])
+async def get_metrics():
+    """
+    Get request, upstream and cache metrics in the Prometheus text format.
+
+    - **http_request_duration_seconds**: Handler latency per route
+    - **upstream_request_duration_seconds** / **upstream_errors_total**: Per host
+      and hop (AEMET's metadata request vs. its datos download)
+    - **upstream_retries_total**: Attempts retried per upstream
+    - **cache_requests_total** / **cache_evictions_total**: Per cache
+    - **process_resident_memory_bytes**: Current RSS
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
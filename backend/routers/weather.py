@@ -1,20 +1,55 @@
 import os
+import re
 import json
-import time
-from typing import List, Optional, Any
+import asyncio
+from typing import Annotated, Callable, Dict, List, Optional, Any, Tuple, Union
 from functools import partial
-from datetime import datetime, timedelta
-import requests
-from pydantic import BaseModel
-from fastapi import APIRouter, HTTPException
+from urllib.parse import urlsplit
+from datetime import date, datetime, timedelta
+import httpx
+from pydantic import BaseModel, TypeAdapter
+from fastapi import APIRouter, HTTPException, Query, Request
 from dotenv import load_dotenv
-from cachetools import TTLCache, cached
 from cachetools.keys import hashkey
+from core.cache import CacheResult, DerivedCache, StaleCache, cached
+from core.responses import prepare, response_cache
+from core import http_client, quota
+from core.archive import archive, downsample
+from core.quota import QuotaExceededError
+from core.resilience import UpstreamError, UpstreamRequestError, call_with_retry
 
 load_dotenv()
 API_KEY = os.getenv("WEATHER_KEY")
-# Cache for 1 hour since concert schedules don't change frequently
-cache_hour = TTLCache(maxsize=1024, ttl=timedelta(hours=0.5), timer=datetime.now)
+# Overridable to point at a stand-in server (see benchmarks/)
+AEMET_BASE_URL = os.getenv("AEMET_BASE_URL", "https://opendata.aemet.es/opendata/api")
+# AEMET allows about 50 requests a minute per key; each forecast fetch is two requests.
+# The quota is the only pacing AEMET calls get, and its waits do not count against the deadline
+quota.register(
+    "aemet",
+    urlsplit(AEMET_BASE_URL).netloc,
+    per_minute=float(os.getenv("AEMET_RATE_PER_MINUTE", 40)),
+    per_day=int(os.getenv("AEMET_DAILY_QUOTA", 0)),
+    burst=4,
+)
+# AEMET municipio (INE) code served when none is given, 41091 is Sevilla
+DEFAULT_MUNICIPIO = os.getenv("WEATHER_MUNICIPIO", "41091")
+# Municipios kept warm by the background scheduler, one per screen
+MUNICIPIOS = [code.strip() for code in os.getenv("WEATHER_MUNICIPIOS", DEFAULT_MUNICIPIO).split(",") if code.strip()]
+# Upper bound on municipios cached at once (least recently used are evicted) and per batch request
+MAX_MUNICIPIOS = int(os.getenv("WEATHER_MAX_MUNICIPIOS", 32))
+# Municipios fetched at the same time by batch requests and refreshes
+AEMET_MAX_CONCURRENCY = int(os.getenv("AEMET_MAX_CONCURRENCY", 2))
+_aemet_slots = asyncio.Semaphore(AEMET_MAX_CONCURRENCY)
+
+MUNICIPIO_PATTERN = r"^\d{5}$"
+
+# Cache for 30 minutes, one hourly and one daily entry per municipio
+# AEMET is slow and rate limited, so forecasts are the last thing evicted under memory pressure
+cache_hour = StaleCache(
+    "weather", maxsize=2 * MAX_MUNICIPIOS, ttl=timedelta(hours=0.5), refetch_cost=timedelta(minutes=30)
+)
+# Refreshed in the background a little before the cache entries expire
+REFRESH_INTERVAL = timedelta(minutes=25)
 
 router = APIRouter()
 
@@ -52,6 +87,16 @@ class CurrentWeatherResponse(BaseModel):
     sunrise: Optional[str]
     sunset: Optional[str]
     hour: Optional[int]
+    interpolated: bool = False  # Taken from the nearest hour the forecast covers
+
+class HourlyForecast(BaseModel):
+    time: datetime
+    temp: Optional[int]
+    feels_like: Optional[int]
+    sky: Optional[str]
+    rain: Optional[str]
+    humidity: Optional[int]
+    interpolated: bool = False  # Missing from the forecast, estimated from the hours around it
 
 class FeelsLikeData(BaseModel):
     hora: Optional[int]
@@ -74,99 +119,400 @@ class DailyWeatherCard(BaseModel):
     probPrecipitacion: List[PrecipitationProbability] = []
     estadoCielo: List[EstadoCielo] = []
 
-@router.get("/weather", response_model=List[DailyForecastResponse])
-def get_weather():
-    """Get the weather forecast for Barcelona"""
-    # get_weather_aemet_horaria returns a list (serializable) for consistency
-    weather = get_weather_aemet_horaria()
-    return weather
+# Per-day fields of the columnar /weather format, hourly ones are one array per day
+COLUMNAR_FIELDS = ["temp", "feels_like", "sky", "rain", "humidity", "prob_precipitacion", "viento"]
+HOURLY_FIELDS = ["temp", "feels_like", "sky", "rain", "humidity"]
+
+class ColumnarDay(BaseModel):
+    fecha: Optional[str]
+    sunrise: Optional[str]
+    sunset: Optional[str]
+    hour: List[Optional[int]]
+    temp: Optional[List[Optional[int]]] = None
+    feels_like: Optional[List[Optional[int]]] = None
+    sky: Optional[List[Optional[int]]] = None  # Indexes into ColumnarForecast.sky_icons
+    rain: Optional[List[Optional[str]]] = None
+    humidity: Optional[List[Optional[int]]] = None
+    prob_precipitacion: Optional[List[PrecipitationProbability]] = None
+    viento: Optional[Any] = None
+
+class ColumnarForecast(BaseModel):
+    sky_icons: List[Optional[str]]
+    days: List[ColumnarDay]
+
+class MunicipioWeather(BaseModel):
+    municipio: str
+    status: str  # "ok", "stale" (served from an expired cache entry) or "error"
+    error: Optional[str] = None
+    forecast: Optional[List[DailyForecastResponse]] = None
+    current: Optional[CurrentWeatherResponse] = None  # None when the forecast does not cover the current hour
+    daily: Optional[List[DailyWeatherCard]] = None
+
+async def _bounded(coro):
+    """Run a municipio fetch once one of the AEMET_MAX_CONCURRENCY slots is free"""
+    async with _aemet_slots:
+        return await coro
+
+async def refresh_weather():
+    """Refetch the hourly and daily forecasts of every configured municipio (run by the background scheduler)"""
+    results = await asyncio.gather(
+        *(_bounded(get_weather_aemet_horaria.refresh(municipio)) for municipio in MUNICIPIOS),
+        *(_bounded(get_weather_aemet_diaria.refresh(municipio)) for municipio in MUNICIPIOS),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+
+# Longest run of missing hours filled in by interpolation
+MAX_INTERPOLATED_HOURS = 3
+
+class HourlyRecord:
+    """The forecast for one hour"""
+
+    __slots__ = ("temp", "feels_like", "sky", "rain", "humidity", "interpolated")
+
+    def __init__(self, temp, feels_like, sky, rain, humidity, interpolated=False):
+        self.temp = temp
+        self.feels_like = feels_like
+        self.sky = sky
+        self.rain = rain
+        self.humidity = humidity
+        self.interpolated = interpolated
+
+class HourlyTable:
+    """
+    An hourly forecast as a flat list indexed by hours since its first day's midnight.
+
+    Looking up any hour is a single index. Short gaps in AEMET's data are
+    filled in when the table is built: numeric values are interpolated
+    linearly, sky and rain are taken from the nearest hour.
+    """
+
+    __slots__ = ("version", "start", "records", "sun")
+
+    def __init__(self, version: float, weather_list: List[dict]):
+        self.version = version
+        days = sorted(weather_list, key=lambda day: day["fecha"])
+        self.start = datetime.fromisoformat(days[0]["fecha"]) if days else datetime.min
+        self.records: List[Optional[HourlyRecord]] = []
+        self.sun: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        for day in days:
+            base = (datetime.fromisoformat(day["fecha"]) - self.start).days * 24
+            self.records.extend([None] * (base + 24 - len(self.records)))
+            for forecast in day.get("forecast_hourly", []):
+                if 0 <= forecast["hour"] < 24:
+                    self.records[base + forecast["hour"]] = HourlyRecord(
+                        _to_int(forecast.get("temp")),
+                        _to_int(forecast.get("feels_like")),
+                        forecast.get("sky"),
+                        forecast.get("rain"),
+                        _to_int(forecast.get("humidity")),
+                    )
+            self.sun[day["fecha"]] = (day.get("sunrise"), day.get("sunset"))
+        self._fill_gaps()
+
+    def _fill_gaps(self):
+        known = [index for index, record in enumerate(self.records) if record is not None]
+        for before, after in zip(known, known[1:]):
+            gap = after - before - 1
+            if not 0 < gap <= MAX_INTERPOLATED_HOURS:
+                continue
+            first, last = self.records[before], self.records[after]
+            for offset in range(1, gap + 1):
+                fraction = offset / (gap + 1)
+                nearest = first if fraction <= 0.5 else last
+                self.records[before + offset] = HourlyRecord(
+                    _lerp(first.temp, last.temp, fraction),
+                    _lerp(first.feels_like, last.feels_like, fraction),
+                    nearest.sky,
+                    nearest.rain,
+                    _lerp(first.humidity, last.humidity, fraction),
+                    interpolated=True,
+                )
+
+    def at(self, moment: datetime) -> Optional[HourlyRecord]:
+        """The forecast for the hour `moment` falls in, or None if it is not covered"""
+        index = (moment.date() - self.start.date()).days * 24 + moment.hour
+        if 0 <= index < len(self.records):
+            return self.records[index]
+        return None
+
+    def nearest(self, moment: datetime) -> Optional[HourlyRecord]:
+        """
+        The forecast for the hour `moment` falls in or, when that hour is not
+        covered (e.g. just before or after the forecast), the nearest covered
+        hour at most MAX_INTERPOLATED_HOURS away, marked interpolated
+        """
+        record = self.at(moment)
+        if record is not None:
+            return record
+        for offset in range(1, MAX_INTERPOLATED_HOURS + 1):
+            for direction in (-1, 1):
+                nearest = self.at(moment + timedelta(hours=direction * offset))
+                if nearest is not None:
+                    return HourlyRecord(
+                        nearest.temp, nearest.feels_like, nearest.sky, nearest.rain, nearest.humidity, interpolated=True
+                    )
+        return None
+
+    def next_hours(self, moment: datetime, hours: int) -> List[Tuple[datetime, HourlyRecord]]:
+        """The forecast for `hours` hours starting with the one `moment` falls in, skipping uncovered hours"""
+        first = moment.replace(minute=0, second=0, microsecond=0)
+        forecast = []
+        for offset in range(hours):
+            when = first + timedelta(hours=offset)
+            record = self.at(when)
+            if record is not None:
+                forecast.append((when, record))
+        return forecast
+
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _lerp(start: Optional[int], end: Optional[int], fraction: float) -> Optional[int]:
+    if start is None or end is None:
+        return start if fraction <= 0.5 else end
+    return round(start + (end - start) * fraction)
+
+# Built once per municipio and refresh, least recently used dropped past MAX_MUNICIPIOS or the memory budget
+_hourly_tables = DerivedCache("hourly_tables", maxsize=MAX_MUNICIPIOS)
+
+def hourly_table(municipio: str, result: CacheResult) -> HourlyTable:
+    """Get the lookup table of a municipio's hourly forecast, building it when the forecast was refetched"""
+    table = _hourly_tables.get(municipio)
+    if table is None or table.version != result.fetched_at:
+        table = HourlyTable(result.fetched_at, result.value)
+        _hourly_tables.set(municipio, table)
+    return table
+
+# Response bodies are validated and serialized once per refresh, see core.responses
+WEATHER_ADAPTER = TypeAdapter(List[DailyForecastResponse])
+CURRENT_ADAPTER = TypeAdapter(CurrentWeatherResponse)
+DAILY_ADAPTER = TypeAdapter(List[DailyWeatherCard])
+HOURLY_ADAPTER = TypeAdapter(List[HourlyForecast])
+COLUMNAR_ADAPTER = TypeAdapter(ColumnarForecast)
+
+Municipio = Annotated[str, Query(pattern=MUNICIPIO_PATTERN, description="AEMET municipio code (e.g. 41091 for Sevilla)")]
+
+@router.get("/weather", response_model=Union[List[DailyForecastResponse], ColumnarForecast])
+async def get_weather(
+    request: Request,
+    municipio: Municipio = DEFAULT_MUNICIPIO,
+    format: str = Query("json", pattern="^(json|columnar)$", description="json (a list of hour objects per day) or columnar"),
+    fields: Optional[str] = Query(
+        None, description=f"Comma-separated fields to include with format=columnar ({', '.join(COLUMNAR_FIELDS)}). Default: all"
+    ),
+):
+    """
+    Get the hourly weather forecast for a municipio.
+
+    With `format=columnar` each day holds one array per field, aligned with
+    its `hour` array, instead of one object per hour, and `sky` holds indexes
+    into the response's `sky_icons`. The payload is a fraction of the size.
+    """
+    if format == "json":
+        if fields:
+            raise HTTPException(status_code=400, detail="fields can only be used with format=columnar")
+        # get_weather_aemet_horaria returns a list (serializable) for consistency
+        result = await get_weather_aemet_horaria.lookup(municipio)
+        prepared = response_cache.get(
+            ("weather", municipio), result.fetched_at, lambda: prepare(WEATHER_ADAPTER, result.value)
+        )
+        return prepared.render(request, result)
+
+    selected = COLUMNAR_FIELDS
+    if fields:
+        selected = list(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+        unknown = [field for field in selected if field not in COLUMNAR_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    result = await get_weather_aemet_horaria.lookup(municipio)
+    prepared = response_cache.get(
+        ("weather_columnar", municipio, tuple(selected)),
+        result.fetched_at,
+        lambda: prepare(COLUMNAR_ADAPTER, build_columnar_weather(result.value, selected), exclude_unset=True),
+    )
+    return prepared.render(request, result)
+
+def build_columnar_weather(days: List[dict], fields: List[str]) -> dict:
+    """Turn the hourly forecast into one array per field and day, with sky icons as dictionary indexes"""
+    sky_icons: Dict[Optional[str], int] = {}
+    columnar_days = []
+    for day in days:
+        hours = day.get("forecast_hourly", [])
+        columnar_day = {
+            "fecha": day.get("fecha"),
+            "sunrise": day.get("sunrise"),
+            "sunset": day.get("sunset"),
+            "hour": [forecast.get("hour") for forecast in hours],
+        }
+        for field in fields:
+            if field == "sky":
+                columnar_day["sky"] = [sky_icons.setdefault(forecast.get("sky"), len(sky_icons)) for forecast in hours]
+            elif field in HOURLY_FIELDS:
+                columnar_day[field] = [forecast.get(field) for forecast in hours]
+            else:
+                columnar_day[field] = day.get(field)
+        columnar_days.append(columnar_day)
+    return {"sky_icons": list(sky_icons), "days": columnar_days}
 
 @router.get("/weather/current", response_model=CurrentWeatherResponse)
-def get_current_weather():
+async def get_current_weather(request: Request, municipio: Municipio = DEFAULT_MUNICIPIO):
     """Get the current weather conditions"""
-    # get a list from the shared data provider (already a list)
-    weather_list = get_weather_aemet_horaria()
+    result = await get_weather_aemet_horaria.lookup(municipio)
+    # The current conditions also change when the hour does
+    now = datetime.now()
+    version = (result.fetched_at, now.strftime("%Y-%m-%d %H"))
+    prepared = response_cache.get(
+        ("weather_current", municipio),
+        version,
+        lambda: prepare(CURRENT_ADAPTER, build_current_weather(hourly_table(municipio, result), now)),
+    )
+    return prepared.render(request, result)
 
-    if not weather_list:
+def build_current_weather(table: HourlyTable, now: Optional[datetime] = None) -> CurrentWeatherResponse:
+    """Pick the current hour's conditions out of the hourly forecast"""
+    now = now or datetime.now()
+    if not table.records:
         raise HTTPException(status_code=404, detail="No weather data available")
 
-    current_date = datetime.now().strftime("%Y-%m-%d")
-    current_hour = datetime.now().hour
-
-    # Find today's data
-    today_data = next((day for day in weather_list if day.get("fecha") == current_date), None)
-    
-    if not today_data or not today_data.get("forecast_hourly"):
-        raise HTTPException(status_code=404, detail="No current weather data available")
-    
-    # Find the current hour's forecast
-    current_forecast = next(
-        (forecast for forecast in today_data["forecast_hourly"] if forecast["hour"] == current_hour),
-        None
-    )
-    
-    # If current hour not found, use the closest available hour
-    if not current_forecast and today_data["forecast_hourly"]:
-        current_forecast = today_data["forecast_hourly"][0]
-    
-    if not current_forecast:
-        raise HTTPException(status_code=404, detail="No forecast data available")
-    
+    current_forecast = table.nearest(now)
+    if current_forecast is None:
+        raise HTTPException(status_code=404, detail="No forecast data available for the current hour")
+
+    sunrise, sunset = table.sun.get(now.strftime("%Y-%m-%d"), (None, None))
     return CurrentWeatherResponse(
-        temp=current_forecast.get("temp"),
-        feels_like=current_forecast.get("feels_like"),
-        sky=current_forecast.get("sky"),
-        humidity=current_forecast.get("humidity"),
-        sunrise=today_data.get("sunrise"),
-        sunset=today_data.get("sunset"),
-        hour=current_forecast.get("hour")
+        temp=current_forecast.temp,
+        feels_like=current_forecast.feels_like,
+        sky=current_forecast.sky,
+        humidity=current_forecast.humidity,
+        sunrise=sunrise,
+        sunset=sunset,
+        hour=now.hour,
+        interpolated=current_forecast.interpolated,
     )
 
+@router.get("/weather/hours", response_model=List[HourlyForecast])
+async def get_next_hours(
+    request: Request,
+    municipio: Municipio = DEFAULT_MUNICIPIO,
+    hours: int = Query(12, ge=1, le=72, description="Number of hours, starting with the current one"),
+):
+    """Get the forecast for the next hours, hours AEMET does not cover are left out"""
+    result = await get_weather_aemet_horaria.lookup(municipio)
+    now = datetime.now()
+    version = (result.fetched_at, now.strftime("%Y-%m-%d %H"))
+
+    def build():
+        forecast = hourly_table(municipio, result).next_hours(now, hours)
+        return prepare(HOURLY_ADAPTER, [
+            HourlyForecast(
+                time=when,
+                temp=record.temp,
+                feels_like=record.feels_like,
+                sky=record.sky,
+                rain=record.rain,
+                humidity=record.humidity,
+                interpolated=record.interpolated,
+            )
+            for when, record in forecast
+        ])
+
+    prepared = response_cache.get(("weather_hours", municipio, hours), version, build)
+    return prepared.render(request, result)
+
 @router.get("/weather/daily", response_model=List[DailyWeatherCard])
-def get_daily_weather():
-    """Get the daily weather forecast for Sevilla (excluding today since we have hourly data)"""
-    daily_forecast = get_weather_aemet_diaria()
-    return daily_forecast
-
-def _fetch_aemet_data_with_retry(max_retries=3, base_delay=2, timeout=20):
-    """Fetch data from AEMET API with retry logic and exponential backoff"""
-    CODIGO_MUNICIPIO = "41091"  # 41091 is the code for Sevilla
-    url_aemet = f"https://opendata.aemet.es/opendata/api/prediccion/especifica/municipio/horaria/{CODIGO_MUNICIPIO}"
+async def get_daily_weather(request: Request, municipio: Municipio = DEFAULT_MUNICIPIO):
+    """Get the daily weather forecast for a municipio (excluding today since we have hourly data)"""
+    result = await get_weather_aemet_diaria.lookup(municipio)
+    prepared = response_cache.get(
+        ("weather_daily", municipio), result.fetched_at, lambda: prepare(DAILY_ADAPTER, result.value)
+    )
+    return prepared.render(request, result)
+
+@router.get("/weather/batch", response_model=List[MunicipioWeather])
+async def get_weather_batch(
+    municipios: str = Query(..., description="Comma-separated AEMET municipio codes"),
+):
+    """
+    Get the hourly forecast, current conditions and daily cards of several municipios at once.
+
+    Municipios are fetched with bounded concurrency and paced against AEMET's
+    rate limit. Each one carries its own status, so one failing town does not
+    fail the whole batch.
+    """
+    codes = list(dict.fromkeys(code.strip() for code in municipios.split(",") if code.strip()))
+    invalid = [code for code in codes if not re.match(MUNICIPIO_PATTERN, code)]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid municipio codes: {', '.join(invalid)}")
+    if not codes or len(codes) > MAX_MUNICIPIOS:
+        raise HTTPException(status_code=400, detail=f"Between 1 and {MAX_MUNICIPIOS} municipios can be requested at once")
+
+    return await asyncio.gather(*(_load_municipio(code) for code in codes))
+
+async def _load_municipio(municipio: str) -> MunicipioWeather:
+    try:
+        horaria, diaria = await asyncio.gather(
+            _bounded(get_weather_aemet_horaria.lookup(municipio)),
+            _bounded(get_weather_aemet_diaria.lookup(municipio)),
+        )
+    except HTTPException as e:
+        return MunicipioWeather(municipio=municipio, status="error", error=str(e.detail))
+    try:
+        current = build_current_weather(hourly_table(municipio, horaria))
+    except HTTPException:
+        # Current conditions are optional, the forecasts are still worth returning
+        current = None
+    return MunicipioWeather(
+        municipio=municipio,
+        status="stale" if horaria.stale or diaria.stale else "ok",
+        forecast=horaria.value,
+        current=current,
+        daily=diaria.value,
+    )
+
+async def _fetch_aemet_data_with_retry(kind: str, municipio: str, timeout=10):
+    """
+    Fetch a municipio forecast from the AEMET API, retrying with backoff.
+
+    Args:
+        kind: "horaria" or "diaria"
+        municipio: AEMET municipio code
+        timeout: Timeout in seconds for each of the two HTTP hops
+    """
+    url_aemet = f"{AEMET_BASE_URL}/prediccion/especifica/municipio/{kind}/{municipio}"
     querystring = {"api_key": API_KEY}
     headers = {'cache-control': "no-cache"}
-    
-    last_exception = None
-    
-    for attempt in range(max_retries):
-        try:
-            # First API call to get the data URL
-            response_aemet = requests.get(url_aemet, headers=headers, params=querystring, timeout=timeout)
-            response_aemet.raise_for_status()
-            aemet_data = response_aemet.json()
-            datos_url = aemet_data.get("datos")
-            
-            if not datos_url:
-                raise ValueError("No data URL returned from AEMET API")
-            
-            # Second API call to get actual data
-            response_datos = requests.get(datos_url, timeout=timeout)
-            response_datos.raise_for_status()
-            return response_datos.json()
-            
-        except (requests.RequestException, ValueError) as e:
-            last_exception = e
-            if attempt < max_retries - 1:
-                delay = base_delay * (2 ** attempt)  # Exponential backoff: 2, 4, 8 seconds
-                time.sleep(delay)
-    
-    # If all retries failed, raise the last exception
-    raise last_exception
+
+    async def fetch():
+        # First API call to get the data URL
+        response_aemet = await http_client.get(
+            url_aemet, hop="metadata", headers=headers, params=querystring, timeout=timeout
+        )
+        response_aemet.raise_for_status()
+        aemet_data = response_aemet.json()
+        datos_url = aemet_data.get("datos")
+
+        if not datos_url:
+            # AEMET answers unknown municipios with a 200 and no data URL
+            raise UpstreamRequestError(f"No data URL returned from AEMET API: {aemet_data.get('descripcion', 'no description')}")
+
+        # Second API call to get actual data
+        response_datos = await http_client.get(datos_url, hop="datos", timeout=timeout)
+        response_datos.raise_for_status()
+        return response_datos.json()
+
+    return await call_with_retry("aemet", fetch, base_delay=2)
 
 @cached(cache_hour, key=partial(hashkey, 'weather_horaria'))
-def get_weather_aemet_horaria():
-    """Calls the AEMET API to get the weather forecast for Sevilla"""
+async def get_weather_aemet_horaria(municipio: str = DEFAULT_MUNICIPIO):
+    """Calls the AEMET API to get the hourly weather forecast for a municipio"""
     try:
-        datos_json = _fetch_aemet_data_with_retry()
+        datos_json = await _fetch_aemet_data_with_retry("horaria", municipio)
         # this is where the actual prediction for each day is, the rest is metadata
         days = datos_json[0].get("prediccion").get("dia")
         forecast_by_date = {}
@@ -210,57 +556,34 @@ def get_weather_aemet_horaria():
 
             forecast_by_date[fecha]["forecast_hourly"].extend(merged_data)
 
+        await _archive_forecast("horaria", municipio, datos_json, partial(_hourly_archive_rows, forecast_by_date.values()))
         # Return a list so callers (and cache) get a serializable structure
         return list(forecast_by_date.values())
 
-    except requests.RequestException as e:
+    except UpstreamRequestError as e:
+        raise HTTPException(status_code=404, detail=f"Unknown municipio {municipio}: {e}")
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 404:
+            raise HTTPException(status_code=404, detail=f"Unknown municipio {municipio}")
+        raise HTTPException(status_code=503, detail=f"Failed to fetch weather data: {str(e)}")
+    except QuotaExceededError as e:
+        raise HTTPException(status_code=503, detail=f"AEMET quota is used up: {e}", headers=quota.retry_headers(e))
+    except (httpx.HTTPError, UpstreamError) as e:
         raise HTTPException(status_code=503, detail=f"Failed to fetch weather data: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
-def _fetch_aemet_data_diaria_with_retry(max_retries=3, base_delay=2, timeout=20):
-    """Fetch daily data from AEMET API with retry logic and exponential backoff"""
-    CODIGO_MUNICIPIO = "41091"  # 41091 is the code for Sevilla
-    url_aemet = f"https://opendata.aemet.es/opendata/api/prediccion/especifica/municipio/diaria/{CODIGO_MUNICIPIO}"
-    querystring = {"api_key": API_KEY}
-    headers = {'cache-control': "no-cache"}
-    
-    last_exception = None
-    
-    for attempt in range(max_retries):
-        try:
-            # First API call to get the data URL
-            response_aemet = requests.get(url_aemet, headers=headers, params=querystring, timeout=timeout)
-            response_aemet.raise_for_status()
-            aemet_data = response_aemet.json()
-            datos_url = aemet_data.get("datos")
-
-            if not datos_url:
-                raise ValueError("No data URL returned from AEMET API")
-            
-            # Second API call to get actual data
-            response_datos = requests.get(datos_url, timeout=timeout)
-            response_datos.raise_for_status()
-            return response_datos.json()
-            
-        except (requests.RequestException, ValueError) as e:
-            last_exception = e
-            if attempt < max_retries - 1:
-                delay = base_delay * (2 ** attempt)  # Exponential backoff: 2, 4, 8 seconds
-                time.sleep(delay)
-    
-    # If all retries failed, raise the last exception
-    raise last_exception
-
 @cached(cache_hour, key=partial(hashkey, 'weather_diaria'))
-def get_weather_aemet_diaria():
-    """Calls the AEMET API to get the daily weather forecast for Sevilla"""
+async def get_weather_aemet_diaria(municipio: str = DEFAULT_MUNICIPIO):
+    """Calls the AEMET API to get the daily weather forecast for a municipio"""
     try:
-        datos_json = _fetch_aemet_data_diaria_with_retry()
+        datos_json = await _fetch_aemet_data_with_retry("diaria", municipio)
         
         # Parse the daily data
         days = datos_json[0].get("prediccion", {}).get("dia", [])
         
+        await _archive_forecast("diaria", municipio, datos_json, partial(_daily_archive_rows, days))
+
         result = []
         current_date = datetime.now().strftime("%Y-%m-%d")
         
@@ -318,7 +641,182 @@ def get_weather_aemet_diaria():
         
         return result
 
-    except requests.RequestException as e:
+    except UpstreamRequestError as e:
+        raise HTTPException(status_code=404, detail=f"Unknown municipio {municipio}: {e}")
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 404:
+            raise HTTPException(status_code=404, detail=f"Unknown municipio {municipio}")
+        raise HTTPException(status_code=503, detail=f"Failed to fetch daily weather data: {str(e)}")
+    except QuotaExceededError as e:
+        raise HTTPException(status_code=503, detail=f"AEMET quota is used up: {e}", headers=quota.retry_headers(e))
+    except (httpx.HTTPError, UpstreamError) as e:
         raise HTTPException(status_code=503, detail=f"Failed to fetch daily weather data: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+# Archived fields and the forecast series each one comes from
+ARCHIVE_FIELDS = {
+    "temp": "horaria",
+    "feels_like": "horaria",
+    "humidity": "horaria",
+    "rain": "horaria",
+    "sky": "horaria",
+    "temp_max": "diaria",
+    "temp_min": "diaria",
+    "rain_prob": "diaria",
+}
+# How long one target of each series lasts, and how far ahead AEMET forecasts it
+ARCHIVE_PERIODS = {"horaria": timedelta(hours=1), "diaria": timedelta(days=1)}
+ARCHIVE_HORIZONS = {"horaria": timedelta(days=3), "diaria": timedelta(days=8)}
+
+def _to_rain(value) -> Optional[float]:
+    # "Ip" (inapreciable) is a trace of rain, below AEMET's 0.1mm resolution
+    if value == "Ip":
+        return 0.0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _hourly_archive_rows(days) -> Dict[datetime, Dict[str, Any]]:
+    rows = {}
+    for day in days:
+        midnight = datetime.fromisoformat(day["fecha"])
+        for forecast in day["forecast_hourly"]:
+            rows[midnight + timedelta(hours=forecast["hour"])] = {
+                "temp": _to_int(forecast.get("temp")),
+                "feels_like": _to_int(forecast.get("feels_like")),
+                "humidity": _to_int(forecast.get("humidity")),
+                "rain": _to_rain(forecast.get("rain")),
+                "sky": forecast.get("sky"),
+            }
+    return rows
+
+def _daily_archive_rows(days: List[dict]) -> Dict[datetime, Dict[str, Any]]:
+    rows = {}
+    for day in days:
+        temperatura = day.get("temperatura") or {}
+        whole_day = [item.get("value") for item in day.get("probPrecipitacion", []) if item.get("periodo") in ("00-24", None)]
+        rows[datetime.fromisoformat(day.get("fecha", "")[:10])] = {
+            "temp_max": _to_int(temperatura.get("maxima")),
+            "temp_min": _to_int(temperatura.get("minima")),
+            "rain_prob": _to_int(whole_day[0]) if whole_day else None,
+        }
+    return rows
+
+async def _archive_forecast(
+    series: str, municipio: str, datos_json: list, build_rows: Callable[[], Dict[datetime, Dict[str, Any]]]
+):
+    """
+    Append a fetched forecast to the archive, a failure only costs the archive entry.
+
+    The rows are built here rather than by the caller, so they are skipped
+    when the archive is disabled and a malformed forecast cannot fail the
+    request that fetched it.
+    """
+    if not archive.enabled:
+        return
+    try:
+        rows = build_rows()
+        elaborado = datos_json[0].get("elaborado")
+        issued_at = datetime.fromisoformat(elaborado) if elaborado else datetime.now()
+        await asyncio.to_thread(archive.append, series, municipio, issued_at, rows)
+    except Exception as e:
+        print(f"Error archiving {series} forecast for {municipio}: {e}")
+
+class ArchivedForecast(BaseModel):
+    issued_at: datetime
+    start: datetime  # Time of values[0], each next value is step_hours later
+    step_hours: int
+    values: List[Optional[Any]]
+
+class ForecastTrendPoint(BaseModel):
+    time: datetime
+    observed: Optional[float]  # Last forecast made before the time had passed
+    forecast: Optional[float]  # Forecast made at least lead_hours before
+    error: Optional[float]  # forecast - observed
+
+ArchiveField = Annotated[str, Query(description=f"Archived field ({', '.join(ARCHIVE_FIELDS)})")]
+
+def _archive_range(from_time: Optional[datetime], to_time: Optional[datetime], default: timedelta) -> Tuple[datetime, datetime]:
+    if not archive.enabled:
+        raise HTTPException(status_code=404, detail="The forecast archive is disabled")
+    to_time = to_time or datetime.now()
+    from_time = from_time or to_time - default
+    if from_time > to_time:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    # AEMET times are local, compare naive
+    return from_time.replace(tzinfo=None), to_time.replace(tzinfo=None)
+
+def _archive_series(field: str) -> str:
+    series = ARCHIVE_FIELDS.get(field)
+    if series is None:
+        raise HTTPException(status_code=400, detail=f"Unknown field, use one of: {', '.join(ARCHIVE_FIELDS)}")
+    return series
+
+@router.get("/weather/archive", response_model=List[ArchivedForecast])
+async def get_weather_archive(
+    municipio: Municipio = DEFAULT_MUNICIPIO,
+    field: ArchiveField = "temp",
+    from_time: Optional[datetime] = Query(None, alias="from", description="Earliest issue time (default: 7 days before 'to')"),
+    to_time: Optional[datetime] = Query(None, alias="to", description="Latest issue time (default: now)"),
+    step: int = Query(1, ge=1, le=168, description="Hours averaged into each value"),
+    limit: int = Query(50, ge=1, le=500, description="Maximum number of forecasts, most recent first"),
+):
+    """
+    Get the forecasts AEMET issued in a time range, one array of values per forecast.
+
+    Every forecast fetched is archived once per issue time, hourly fields
+    (temp, feels_like, humidity, rain, sky) from the hourly forecast and
+    daily ones (temp_max, temp_min, rain_prob) from the daily forecast.
+    """
+    series = _archive_series(field)
+    from_time, to_time = _archive_range(from_time, to_time, timedelta(days=7))
+    snapshots = await asyncio.to_thread(archive.snapshots, series, municipio, from_time, to_time, None, limit)
+    forecasts = []
+    for snapshot in reversed(snapshots):
+        start, values = downsample(snapshot, field, step)
+        forecasts.append(ArchivedForecast(issued_at=snapshot.issued, start=start, step_hours=step, values=values))
+    return forecasts
+
+@router.get("/weather/archive/trend", response_model=List[ForecastTrendPoint])
+async def get_weather_trend(
+    municipio: Municipio = DEFAULT_MUNICIPIO,
+    field: ArchiveField = "temp",
+    lead: int = Query(24, ge=0, le=192, description="Hours ahead the compared forecast was issued"),
+    from_time: Optional[datetime] = Query(None, alias="from", description="First time (default: 7 days before 'to')"),
+    to_time: Optional[datetime] = Query(None, alias="to", description="Last time (default: now)"),
+    step: int = Query(1, ge=1, le=720, description="Hours averaged into each point"),
+):
+    """
+    Get how a field's forecast made `lead` hours ahead compared with what
+    happened, over a time range.
+
+    There are no observations in the archive, so the last forecast made for
+    each hour (or day, for daily fields) stands in for the observed value.
+    """
+    series = _archive_series(field)
+    if field == "sky":
+        raise HTTPException(status_code=400, detail="Trends are only available for numeric fields")
+    from_time, to_time = _archive_range(from_time, to_time, timedelta(days=7))
+    points = await asyncio.to_thread(
+        archive.trend,
+        series,
+        municipio,
+        field,
+        from_time,
+        to_time,
+        timedelta(hours=lead),
+        ARCHIVE_PERIODS[series],
+        step,
+        ARCHIVE_HORIZONS[series],
+    )
+    return [
+        ForecastTrendPoint(
+            time=when,
+            observed=observed,
+            forecast=forecast,
+            error=round(forecast - observed, 1) if observed is not None and forecast is not None else None,
+        )
+        for when, observed, forecast in points
+    ]
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Keep tests away from the snapshot and archive files under data/
+os.environ["CACHE_DB_PATH"] = ""
+os.environ["ARCHIVE_DB_PATH"] = ""
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
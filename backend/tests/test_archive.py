@@ -0,0 +1,69 @@
+import asyncio
+from datetime import datetime, timedelta
+from functools import partial
+import pytest
+from core.archive import _MISSING_TEXT, ForecastArchive, _decode, _encode
+from routers import weather
+
+
+def test_numbers_round_trip_in_tenths():
+    targets = [1000, 1001, 1003]
+    snapshot = _decode(42, _encode(targets, {"temp": [12.34, -3, None], "rain": [0, 0.06, 1.0]}))
+    assert snapshot.issued_at == 42
+    assert snapshot.targets == targets
+    assert snapshot.columns["temp"] == [12.3, -3.0, None]
+    assert snapshot.columns["rain"] == [0.0, 0.1, 1.0]
+
+
+def test_numbers_out_of_int16_range_become_missing():
+    snapshot = _decode(0, _encode([0, 1], {"pressure": [3276.7, 3276.8]}))
+    assert snapshot.columns["pressure"] == [3276.7, None]
+
+
+def test_text_round_trips_through_the_dictionary():
+    values = ["WiCloud", None, "WiRain", "WiCloud"]
+    snapshot = _decode(0, _encode([0, 1, 2, 3], {"sky": values}))
+    assert snapshot.columns["sky"] == values
+
+
+def test_text_beyond_the_dictionary_size_becomes_missing():
+    values = [f"word{i:03d}" for i in range(_MISSING_TEXT + 5)]
+    snapshot = _decode(0, _encode(list(range(len(values))), {"sky": values}))
+    assert snapshot.columns["sky"][:_MISSING_TEXT] == values[:_MISSING_TEXT]
+    assert set(snapshot.columns["sky"][_MISSING_TEXT:]) == {None}
+
+
+def test_columns_keep_their_order():
+    columns = {"temp": [1, 2], "sky": ["a", "b"], "rain": [0, None]}
+    assert list(_decode(0, _encode([5, 6], columns)).columns) == ["temp", "sky", "rain"]
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = ForecastArchive(str(tmp_path / "archive.db"), retention=timedelta(days=3650))
+    yield archive
+    archive.close()
+
+
+def test_snapshots_are_read_back_oldest_first(archive):
+    issued = datetime(2025, 11, 14, 6)
+    for day in range(3):
+        rows = {issued + timedelta(days=day, hours=hour): {"temp": day + hour / 10} for hour in range(3)}
+        assert archive.append("horaria", "41091", issued + timedelta(days=day), rows)
+    # The same issue time again is skipped
+    assert not archive.append("horaria", "41091", issued, {issued: {"temp": 0}})
+
+    snapshots = archive.snapshots("horaria", "41091", issued, issued + timedelta(days=2))
+    assert [snapshot.issued for snapshot in snapshots] == [issued + timedelta(days=day) for day in range(3)]
+    assert snapshots[1].columns["temp"] == [1.0, 1.1, 1.2]
+
+    latest = archive.snapshots("horaria", "41091", issued, issued + timedelta(days=2), limit=1)
+    assert [snapshot.issued for snapshot in latest] == [issued + timedelta(days=2)]
+    assert archive.snapshots("horaria", "other", issued, issued + timedelta(days=2)) == []
+
+
+def test_malformed_forecasts_only_cost_the_archive_entry(archive, monkeypatch):
+    monkeypatch.setattr(weather, "archive", archive)
+    days = [{"fecha": "2025-11-14T00:00:00", "temperatura": {"maxima": 20}}, {"temperatura": {"maxima": 21}}]
+    asyncio.run(weather._archive_forecast("diaria", "41091", [{}], partial(weather._daily_archive_rows, days)))
+    assert archive.snapshots("diaria", "41091", datetime(2000, 1, 1), datetime.now()) == []
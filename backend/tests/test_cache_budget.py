@@ -0,0 +1,34 @@
+from datetime import timedelta
+from pydantic import TypeAdapter
+from core.cache import DerivedCache, StaleCache, budget, estimate_size
+from core.responses import ResponseCache, prepare
+
+
+def test_sizes_include_slotted_objects():
+    prepared = prepare(TypeAdapter(list), list(range(1000)))
+    assert estimate_size(prepared) >= len(prepared.body) + len(prepared.gzip)
+
+
+def test_response_bodies_are_charged_to_the_budget():
+    responses = ResponseCache(maxsize=4)
+    before = budget.used
+    prepared = responses.get("key", 1, lambda: prepare(TypeAdapter(str), "x" * 10000))
+    assert budget.used - before >= len(prepared.body)
+    # Same version: reused, not charged twice
+    assert responses.get("key", 1, lambda: prepare(TypeAdapter(str), "y")) is prepared
+    assert responses.stats()["entries"] == 1
+    assert responses.stats()["bytes"] == budget.used - before
+
+
+def test_budget_evicts_derived_values_before_costly_data(monkeypatch):
+    # Only the two caches below, whatever other tests left in the real ones
+    monkeypatch.setattr(budget, "caches", [])
+    monkeypatch.setattr(budget, "used", 0)
+    data = StaleCache("test_budget_data", ttl=timedelta(minutes=5), persistent=False, refetch_cost=timedelta(hours=1))
+    derived = DerivedCache("test_budget_derived")
+    data.set("forecast", "x" * 10000)
+    derived.set("table", "y" * 10000)
+    monkeypatch.setattr(budget, "max_bytes", budget.used - 1)
+    derived.set("other", "z")
+    assert "table" not in derived.entries
+    assert "forecast" in data.entries
@@ -0,0 +1,56 @@
+from datetime import date
+from routers.calendar import HolidayIndex, parse_ics
+
+ICS = "\r\n".join([
+    "BEGIN:VCALENDAR",
+    "VERSION:2.0",
+    "BEGIN:VEVENT",
+    "UID:new-year@test",
+    "DTSTART;VALUE=DATE:20250101",
+    "DTEND;VALUE=DATE:20250102",
+    "SUMMARY:Año Nuevo",
+    "DESCRIPTION:Fiesta nacional\\, no sustituible",
+    "END:VEVENT",
+    "BEGIN:VEVENT",
+    "DTSTART:20250414T000000Z",
+    "SUMMARY:Feria de",
+    "  Abril",
+    "DTEND;VALUE=DATE:20250420",
+    "END:VEVENT",
+    "BEGIN:VEVENT",
+    "SUMMARY:Sin fecha",
+    "END:VEVENT",
+    "BEGIN:VEVENT",
+    "DTSTART:20250815",
+    "SUMMARY:Asunción",
+    "END:VEVENT",
+    "END:VCALENDAR",
+])
+
+
+def test_events_are_parsed():
+    holidays = parse_ics(ICS, "test")
+    assert [holiday.title for holiday in holidays] == ["Año Nuevo", "Feria de Abril", "Asunción"]
+    new_year = holidays[0]
+    assert (new_year.start, new_year.end, new_year.uid) == (date(2025, 1, 1), date(2025, 1, 2), "new-year@test")
+    assert new_year.description == "Fiesta nacional, no sustituible"
+    assert new_year.source == "test"
+
+
+def test_date_times_keep_the_day_and_missing_ends_last_one_day():
+    feria, assumption = parse_ics(ICS, "test")[1:]
+    assert (feria.start, feria.end) == (date(2025, 4, 14), date(2025, 4, 20))
+    assert feria.description is None
+    assert (assumption.start, assumption.end) == (date(2025, 8, 15), date(2025, 8, 16))
+
+
+def test_text_outside_events_is_ignored():
+    assert parse_ics("SUMMARY:Nothing\nBEGIN:VCALENDAR\nEND:VCALENDAR", "test") == []
+
+
+def test_index_finds_holidays_overlapping_a_range():
+    index = HolidayIndex(0, parse_ics(ICS, "test"))
+    # The Feria started before the range but is still running
+    assert [holiday.title for holiday in index.query(date(2025, 4, 18), date(2025, 8, 31))] == ["Feria de Abril", "Asunción"]
+    assert [holiday.title for holiday in index.query(date(2025, 4, 20), date(2025, 8, 14))] == []
+    assert [holiday.title for holiday in index.query(None, None, limit=1)] == ["Año Nuevo"]
@@ -0,0 +1,48 @@
+"""
+The programacion parser only builds the page's content block (a SoupStrainer),
+so these tests pin its output to a full-page BeautifulSoup parse.
+"""
+import glob
+import os
+import pytest
+from benchmarks.bench_concert_parser import FIXTURES_DIR, parse_full_page
+from routers.concerts import parse_programacion
+
+FIXTURES = sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html")))
+
+PAGE = """<html><body><div class="menu"><p>Menú <b>sin cerrar</p></div>
+<div class="entry-content"><a name="programacion"></a>{body}</div>
+<div class="footer"><strong>12 enero 2026</strong> · Fuera de la sección</div></body></html>"""
+
+
+def test_fixtures_exist():
+    assert FIXTURES
+
+
+@pytest.mark.parametrize("path", FIXTURES, ids=os.path.basename)
+def test_matches_full_page_parse(path):
+    with open(path, "rb") as f:
+        content = f.read()
+    events = parse_programacion(content)
+    assert events
+    assert events == parse_full_page(content)
+
+
+@pytest.mark.parametrize("body", [
+    "<strong>Viernes 14 noviembre 2025</strong> · Grupo A<br><strong>Sábado 15 noviembre</strong>· Grupo B",
+    # Unclosed and stray tags around the events
+    "<p><strong>3 marzo</strong> <i>x</i> · Con cursiva<p><strong>4 marzo</strong></br> · Tras br</span>",
+    # Entities, comments and nested containers
+    "<div><strong>5 abril &amp; 6 abril</strong><!-- nota --> · Doble &ntilde;</div><strong>7 abril</strong> · Fuera del div",
+    # A date without a description, then a non-date strong
+    "<strong>8 mayo</strong><strong>Aviso</strong> · No es fecha",
+    "<strong>9 junio</strong> · Último",
+])
+def test_matches_full_page_parse_on_edge_cases(body):
+    content = PAGE.format(body=body).encode("utf-8")
+    assert parse_programacion(content) == parse_full_page(content)
+
+
+def test_pages_without_the_content_block_are_parsed_whole():
+    content = PAGE.format(body="<strong>9 junio</strong> · Último").replace("entry-content", "otra").encode("utf-8")
+    assert parse_programacion(content) == [{"date": "9 junio", "description": "Último"}]
@@ -0,0 +1,40 @@
+from datetime import datetime
+import pytest
+from fastapi import HTTPException
+from routers.weather import MAX_INTERPOLATED_HOURS, HourlyTable, build_current_weather
+
+
+def make_table(hours, fecha="2025-11-14"):
+    forecast = [
+        {"hour": hour, "temp": str(hour), "feels_like": str(hour - 1), "sky": "WiCloud", "rain": "0", "humidity": "50"}
+        for hour in hours
+    ]
+    return HourlyTable(1.0, [{"fecha": fecha, "forecast_hourly": forecast, "sunrise": "08:00", "sunset": "18:00"}])
+
+
+def test_current_hour_is_looked_up_directly():
+    current = build_current_weather(make_table(range(24)), datetime(2025, 11, 14, 12, 30))
+    assert (current.temp, current.hour, current.interpolated) == (12, 12, False)
+    assert current.sunrise == "08:00"
+
+
+def test_interior_gaps_are_interpolated():
+    table = make_table([10, 14])
+    record = table.at(datetime(2025, 11, 14, 12))
+    assert record.temp == 12
+    assert record.interpolated
+
+
+def test_hours_before_and_after_the_forecast_use_the_nearest_hour():
+    table = make_table(range(7, 24))
+    before = build_current_weather(table, datetime(2025, 11, 14, 7 - MAX_INTERPOLATED_HOURS))
+    assert (before.temp, before.interpolated) == (7, True)
+    after = build_current_weather(table, datetime(2025, 11, 15, MAX_INTERPOLATED_HOURS - 1))
+    assert (after.temp, after.interpolated) == (23, True)
+
+
+def test_hours_far_from_the_forecast_are_not_found():
+    table = make_table(range(7, 24))
+    with pytest.raises(HTTPException) as error:
+        build_current_weather(table, datetime(2025, 11, 14, 7 - MAX_INTERPOLATED_HOURS - 1))
+    assert error.value.status_code == 404
@@ -0,0 +1,154 @@
+import asyncio
+from datetime import timedelta
+import pytest
+from core import quota, resilience
+from core.quota import QuotaExceededError, UpstreamQuota
+
+
+@pytest.fixture(autouse=True)
+def isolated_quotas(monkeypatch):
+    monkeypatch.setattr(quota, "DAILY_RESERVE", 0.2)
+    monkeypatch.setattr(quota, "QUOTAS", {})
+
+
+def acquire_many(upstream_quota, n, call_priority="on_demand"):
+    """Try `n` calls in a row, returning how many were allowed"""
+
+    async def run():
+        quota.priority.set(call_priority)
+        allowed = 0
+        for _ in range(n):
+            try:
+                await upstream_quota.acquire()
+            except QuotaExceededError:
+                continue
+            allowed += 1
+        return allowed
+
+    return asyncio.run(run())
+
+
+def test_burst_is_allowed_then_on_demand_calls_are_refused():
+    upstream_quota = UpstreamQuota("test", "upstream.test", per_minute=1, burst=3)
+    assert acquire_many(upstream_quota, 5) == 3
+    assert upstream_quota.refused == {"scheduled": 0, "on_demand": 2}
+
+
+def test_on_demand_calls_wait_briefly_for_a_token():
+    upstream_quota = UpstreamQuota("test", "upstream.test", per_minute=6000, burst=1)
+    assert acquire_many(upstream_quota, 5) == 5
+
+
+def test_on_demand_calls_stop_before_the_reserve():
+    upstream_quota = UpstreamQuota("test", "upstream.test", per_minute=60000, per_day=10, burst=100)
+    assert acquire_many(upstream_quota, 10) == 8
+    assert acquire_many(upstream_quota, 10, "scheduled") == 2
+    assert upstream_quota.snapshot()["remaining_today"] == 0
+
+
+def test_scheduled_calls_do_not_use_up_the_on_demand_share():
+    upstream_quota = UpstreamQuota("test", "upstream.test", per_minute=60000, per_day=10, burst=100)
+    assert acquire_many(upstream_quota, 5, "scheduled") == 5
+    assert acquire_many(upstream_quota, 10) == 5
+    assert upstream_quota.snapshot()["used_today"] == {"scheduled": 5, "on_demand": 5}
+
+
+def test_cancelled_wait_gives_the_token_back():
+    upstream_quota = UpstreamQuota("test", "upstream.test", per_minute=60, burst=1)
+
+    async def run():
+        quota.priority.set("scheduled")
+        await upstream_quota.acquire()
+        waiting = asyncio.ensure_future(upstream_quota.acquire())
+        await asyncio.sleep(0.05)
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+
+    asyncio.run(run())
+    assert upstream_quota.used_today == {"scheduled": 1, "on_demand": 0}
+    assert upstream_quota.snapshot()["tokens"] >= 0
+
+
+def test_a_host_cannot_have_two_upstreams():
+    quota.register("aemet", "upstream.test", per_minute=60)
+    quota.register("aemet", "upstream.test", per_minute=30)
+    with pytest.raises(ValueError):
+        quota.register("guardian", "upstream.test", per_minute=60)
+    assert quota.QUOTAS["upstream.test"].rate == 0.5
+
+
+def test_hosts_without_a_quota_are_not_limited():
+    async def run():
+        for _ in range(100):
+            await quota.acquire("unlimited.test")
+
+    asyncio.run(run())
+
+
+def test_time_waiting_for_a_token_is_left_out_of_the_deadline(monkeypatch):
+    monkeypatch.setattr(resilience, "BREAKERS", {})
+    upstream_quota = quota.register("test", "upstream.test", per_minute=600, burst=1)
+
+    async def fetch():
+        await quota.acquire("upstream.test")
+        return "ok"
+
+    async def run():
+        quota.priority.set("scheduled")
+        calls = (resilience.call_with_retry("test", fetch, deadline=timedelta(seconds=0.15)) for _ in range(3))
+        return await asyncio.gather(*calls)
+
+    # The third call waits 0.2s for its token, longer than the whole deadline
+    assert asyncio.run(run()) == ["ok", "ok", "ok"]
+    assert upstream_quota.used_today["scheduled"] == 3
+
+
+def test_waiting_refreshes_leave_tokens_for_requests():
+    upstream_quota = UpstreamQuota("test", "upstream.test", per_minute=60, burst=1)
+
+    async def run():
+        async def refresh():
+            quota.priority.set("scheduled")
+            await upstream_quota.acquire()
+
+        refreshes = [asyncio.ensure_future(refresh()) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        # One refresh took the only token, the others wait without going into debt
+        assert upstream_quota.tokens > -0.1
+        quota.priority.set("on_demand")
+        await upstream_quota.acquire()
+        for waiting in refreshes:
+            waiting.cancel()
+        await asyncio.gather(*refreshes, return_exceptions=True)
+
+    asyncio.run(run())
+    assert upstream_quota.used_today == {"scheduled": 1, "on_demand": 1}
+
+
+def test_zero_rate_means_no_rate_limit():
+    upstream_quota = UpstreamQuota("test", "upstream.test", per_minute=0, per_day=3)
+    assert acquire_many(upstream_quota, 5) == 2
+    assert upstream_quota.snapshot()["per_minute"] is None
+
+
+def test_a_new_day_resets_the_daily_counters():
+    upstream_quota = UpstreamQuota("test", "upstream.test", per_minute=60000, per_day=10, burst=100)
+    acquire_many(upstream_quota, 10)
+    upstream_quota.day -= timedelta(days=1)
+    snapshot = upstream_quota.snapshot()
+    assert snapshot["used_today"] == {"scheduled": 0, "on_demand": 0}
+    assert snapshot["remaining_today"] == 10
+
+
+def test_refusals_say_when_to_retry():
+    upstream_quota = UpstreamQuota("test", "upstream.test", per_minute=6, burst=1)
+    acquire_many(upstream_quota, 1)
+
+    async def run():
+        with pytest.raises(QuotaExceededError) as error:
+            await upstream_quota.acquire()
+        return error.value
+
+    error = asyncio.run(run())
+    assert 9 < error.retry_after <= 10
+    assert quota.retry_headers(error) == {"Retry-After": "10"}
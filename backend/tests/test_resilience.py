@@ -0,0 +1,111 @@
+import asyncio
+import time
+from datetime import timedelta
+import httpx
+import pytest
+from core import resilience
+from core.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceededError,
+    UpstreamRequestError,
+    call_with_retry,
+)
+
+
+def http_error(status):
+    request = httpx.Request("GET", "https://upstream.test/")
+    return httpx.HTTPStatusError("error", request=request, response=httpx.Response(status, request=request))
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers(monkeypatch):
+    monkeypatch.setattr(resilience, "BREAKERS", {})
+
+
+def test_breaker_opens_after_threshold_failures():
+    breaker = CircuitBreaker("test", failure_threshold=3, cooldown=timedelta(minutes=1))
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure(RuntimeError("down"))
+    assert breaker.state == "closed"
+    breaker.before_call()
+    breaker.record_failure(RuntimeError("down"))
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_breaker_success_resets_failures():
+    breaker = CircuitBreaker("test", failure_threshold=2)
+    breaker.record_failure(RuntimeError("down"))
+    breaker.record_success()
+    breaker.record_failure(RuntimeError("down"))
+    assert (breaker.state, breaker.failures) == ("closed", 1)
+
+
+def test_breaker_lets_one_trial_through_after_cooldown():
+    breaker = CircuitBreaker("test", failure_threshold=1, cooldown=timedelta(seconds=10))
+    breaker.record_failure(RuntimeError("down"))
+    breaker.opened_at = time.time() - 11
+    breaker.before_call()
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+
+def test_failed_trial_opens_the_circuit_again():
+    breaker = CircuitBreaker("test", failure_threshold=5, cooldown=timedelta(seconds=10))
+    breaker.state, breaker.opened_at = "open", time.time() - 11
+    breaker.before_call()
+    breaker.record_failure(RuntimeError("still down"))
+    assert breaker.state == "open"
+
+
+def test_cancelled_trial_frees_the_slot():
+    breaker = CircuitBreaker("test")
+    breaker.state = "half_open"
+    breaker.before_call()
+    breaker.cancel_trial()
+    breaker.before_call()
+
+
+def test_server_errors_are_retried_and_counted():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        if len(calls) < 3:
+            raise http_error(503)
+        return "ok"
+
+    result = asyncio.run(call_with_retry("retried", fetch, base_delay=0))
+    assert (result, len(calls)) == ("ok", 3)
+    assert resilience.BREAKERS["retried"].state == "closed"
+
+
+@pytest.mark.parametrize("error", [http_error(404), UpstreamRequestError("unknown municipio")])
+def test_client_errors_are_not_retried_or_counted(error):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        raise error
+
+    with pytest.raises(type(error)):
+        asyncio.run(call_with_retry("client_error", fetch, base_delay=0))
+    assert len(calls) == 1
+    assert resilience.BREAKERS["client_error"].failures == 0
+
+
+def test_deadline_counts_as_a_failure():
+    async def fetch():
+        await asyncio.sleep(1)
+
+    with pytest.raises(DeadlineExceededError):
+        asyncio.run(call_with_retry("slow", fetch, deadline=timedelta(seconds=0.05)))
+    assert resilience.BREAKERS["slow"].failures == 1
+
@@ -0,0 +1,33 @@
+from pydantic import TypeAdapter
+from starlette.requests import Request
+from core.responses import prepare
+
+
+def request(**headers):
+    raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+def test_each_encoding_has_its_own_etag():
+    prepared = prepare(TypeAdapter(list), list(range(100)))
+    identity = prepared.render(request())
+    gzipped = prepared.render(request(accept_encoding="gzip"))
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert identity.headers["etag"] != gzipped.headers["etag"]
+    assert gzipped.headers["etag"].endswith('-gzip"')
+
+
+def test_zero_quality_refuses_an_encoding():
+    prepared = prepare(TypeAdapter(list), list(range(100)))
+    response = prepared.render(request(accept_encoding="br;q=0, gzip;q=0.5"))
+    assert response.headers["content-encoding"] == "gzip"
+    response = prepared.render(request(accept_encoding="*;q=0"))
+    assert "content-encoding" not in response.headers
+    assert response.body == prepared.body
+
+
+def test_not_modified_only_for_the_same_representation():
+    prepared = prepare(TypeAdapter(list), list(range(100)))
+    etag = prepared.render(request(accept_encoding="gzip")).headers["etag"]
+    assert prepared.render(request(accept_encoding="gzip", if_none_match=etag)).status_code == 304
+    assert prepared.render(request(if_none_match=etag)).status_code == 200
@@ -0,0 +1,152 @@
+import asyncio
+import time
+from datetime import timedelta
+import pytest
+from fastapi import HTTPException
+from core.cache import StaleCache
+
+
+def make_cache(name, **kwargs):
+    return StaleCache(f"test_{name}", ttl=timedelta(minutes=5), persistent=False, **kwargs)
+
+
+class Upstream:
+    """A fetch function that counts its calls and returns (or raises) what it is told"""
+
+    def __init__(self, value="fresh", error=None, delay=0.0):
+        self.value = value
+        self.error = error
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+def test_fresh_entries_are_served_without_fetching():
+    async def run():
+        cache = make_cache("fresh")
+        upstream = Upstream()
+        first = await cache.get("key", upstream)
+        second = await cache.get("key", upstream)
+        return upstream.calls, first, second
+
+    calls, first, second = asyncio.run(run())
+    assert calls == 1
+    assert (first.value, first.stale) == ("fresh", False)
+    assert (second.value, second.stale) == ("fresh", False)
+
+
+def test_expired_entries_are_served_stale_while_refreshing():
+    async def run():
+        cache = make_cache("stale")
+        cache.set("key", "old", time.time() - cache.ttl - 1)
+        upstream = Upstream()
+        result = await cache.get("key", upstream)
+        await asyncio.sleep(0.01)
+        return result, upstream.calls, cache.peek("key").value
+
+    result, calls, refreshed = asyncio.run(run())
+    assert (result.value, result.stale) == ("old", True)
+    assert calls == 1
+    assert refreshed == "fresh"
+
+
+def test_entries_past_max_stale_are_refetched():
+    async def run():
+        cache = make_cache("too_old", max_stale=timedelta(minutes=1))
+        cache.set("key", "old", time.time() - cache.ttl - 120)
+        return await cache.get("key", Upstream())
+
+    result = asyncio.run(run())
+    assert (result.value, result.stale) == ("fresh", False)
+
+
+def test_failed_refresh_keeps_serving_the_last_value():
+    async def run():
+        cache = make_cache("keep")
+        cache.set("key", "old", time.time() - cache.ttl - 1)
+        await cache.get("key", Upstream(error=RuntimeError("upstream down")))
+        await asyncio.sleep(0.01)
+        return await cache.get("key", Upstream())
+
+    result = asyncio.run(run())
+    # The failure is remembered, so the second lookup does not refresh either
+    assert (result.value, result.stale) == ("old", True)
+
+
+def test_errors_are_remembered_for_error_ttl():
+    async def run():
+        cache = make_cache("errors", error_ttl=timedelta(seconds=30))
+        upstream = Upstream(error=RuntimeError("upstream down"))
+        errors = []
+        for _ in range(3):
+            with pytest.raises(RuntimeError) as error:
+                await cache.get("key", upstream)
+            errors.append(error.value)
+        return upstream.calls, errors
+
+    calls, errors = asyncio.run(run())
+    assert calls == 1
+    assert errors[0] is errors[1] is errors[2]
+
+
+def test_errors_expire_after_error_ttl():
+    async def run():
+        cache = make_cache("errors_expire", error_ttl=timedelta(0))
+        with pytest.raises(RuntimeError):
+            await cache.get("key", Upstream(error=RuntimeError("upstream down")))
+        return await cache.get("key", Upstream())
+
+    assert asyncio.run(run()).value == "fresh"
+
+
+def test_client_errors_are_not_remembered():
+    async def run():
+        cache = make_cache("client_errors")
+        with pytest.raises(HTTPException):
+            await cache.get("key", Upstream(error=HTTPException(status_code=404, detail="Unknown municipio")))
+        return await cache.get("key", Upstream())
+
+    assert asyncio.run(run()).value == "fresh"
+
+
+def test_concurrent_misses_share_one_fetch():
+    async def run():
+        cache = make_cache("coalesce")
+        upstream = Upstream(delay=0.05)
+        results = await asyncio.gather(*(cache.get("key", upstream) for _ in range(10)))
+        return upstream.calls, results
+
+    calls, results = asyncio.run(run())
+    assert calls == 1
+    assert {result.value for result in results} == {"fresh"}
+
+
+def test_refresh_joins_a_fetch_in_flight():
+    async def run():
+        cache = make_cache("refresh")
+        upstream = Upstream(delay=0.05)
+        lookup = asyncio.ensure_future(cache.get("key", upstream))
+        await asyncio.sleep(0)
+        value = await cache.refresh("key", upstream)
+        return upstream.calls, value, (await lookup).value
+
+    assert asyncio.run(run()) == (1, "fresh", "fresh")
+
+
+def test_keys_can_have_their_own_ttl():
+    async def run():
+        cache = make_cache("key_ttl")
+        cache.set_ttl("slow", timedelta(hours=3))
+        for key in ("slow", "fast"):
+            cache.set(key, "old", time.time() - cache.ttl - 1)
+        return await cache.get("slow", Upstream()), await cache.get("fast", Upstream())
+
+    slow, fast = asyncio.run(run())
+    assert not slow.stale
+    assert fast.stale
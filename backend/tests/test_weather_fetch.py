@@ -0,0 +1,44 @@
+import asyncio
+import time
+import pytest
+from fastapi import HTTPException
+from core.cache import CacheResult
+from core.resilience import UpstreamRequestError
+from routers import weather
+
+
+def test_unknown_municipios_are_not_found(monkeypatch):
+    calls = []
+
+    async def fetch(kind, municipio):
+        calls.append(municipio)
+        raise UpstreamRequestError("No data URL returned from AEMET API: no description")
+
+    monkeypatch.setattr(weather, "_fetch_aemet_data_with_retry", fetch)
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(HTTPException) as error:
+                await weather.get_weather_aemet_diaria("99998")
+            assert error.value.status_code == 404
+
+    asyncio.run(run())
+    # Not remembered as an outage, each lookup asks again
+    assert calls == ["99998", "99998"]
+
+
+def test_batch_keeps_forecasts_without_current_conditions(monkeypatch):
+    # A forecast for a day long gone, so there is no current hour in it
+    hour = {"hour": 12, "temp": "10", "feels_like": "9", "sky": None, "rain": "0", "humidity": "50"}
+    horaria = [{"fecha": "2000-01-01", "forecast_hourly": [hour], "sunrise": None, "sunset": None, "viento": None}]
+
+    async def lookup(value):
+        return CacheResult(value, 0.0, stale=False, fetched_at=time.time())
+
+    monkeypatch.setattr(weather.get_weather_aemet_horaria, "lookup", lambda municipio: lookup(horaria))
+    monkeypatch.setattr(weather.get_weather_aemet_diaria, "lookup", lambda municipio: lookup([]))
+
+    result = asyncio.run(weather._load_municipio("41091"))
+    assert result.status == "ok"
+    assert result.current is None
+    assert result.forecast[0].fecha == "2000-01-01"
@@ -4,7 +4,6 @@ import FullCalendar from "@fullcalendar/react";
 import dayGridPlugin from "@fullcalendar/daygrid";
 import interactionPlugin from "@fullcalendar/interaction";
 import esLocale from "@fullcalendar/core/locales/es";
-import ICAL from "ical.js";
 import './../App.css';
 
 const CustomCalendar = () => {
@@ -15,28 +14,23 @@ const CustomCalendar = () => {
    useEffect(() => {
       const loadEvents = async () => {
          try {
-            const response = await fetch("/calendarifestius_es.ics");
-            const data = await response.text();
-            const jcalData = ICAL.parse(data);
-            const comp = new ICAL.Component(jcalData);
-            const vevents = comp.getAllSubcomponents("vevent");
-            const fcEvents = vevents.map((vevent) => {
-               const event = new ICAL.Event(vevent);
-               return {
-                  id: `ics-${event.uid}`,
-                  title: event.summary,
-                  start: event.startDate.toJSDate(),
-                  end: event.endDate ? event.endDate.toJSDate() : null,
-                  allDay: true,
-                  color: "#414833",
-               };
-            });
+            // Parsed and indexed by the backend, only the holidays come over the wire
+            const response = await fetch(`${import.meta.env.VITE_BACKEND_URL}/calendar`);
+            const holidays = await response.json();
+            const fcEvents = holidays.map((holiday) => ({
+               id: `ics-${holiday.uid || `${holiday.start}-${holiday.title}`}`,
+               title: holiday.title,
+               start: holiday.start,
+               end: holiday.end,
+               allDay: true,
+               color: "#414833",
+            }));
 
             const savedEvents = JSON.parse(localStorage.getItem("userEvents")) || [];
             setEvents([...fcEvents, ...savedEvents]);
             setIcsEventsLoaded(true);
          } catch (err) {
-            console.error("Error fetching ICS file:", err);
+            console.error("Error fetching holidays:", err);
          }
       };
 
@@ -117,20 +117,18 @@ const NewsList = () => {
       const fetchNews = async () => {
          try {
             setLoading(true);
-            const articles = [];
+            // Fetch every section in one request
+            const response = await fetch(
+               `${import.meta.env.VITE_BACKEND_URL}/news/batch?sections=${selectedSections.join(",")}&page_size=15`
+            );
 
-            // Fetch news for each section and combine
-            for (const section of selectedSections) {
-               const response = await fetch(`http://localhost:8000/news?section=${section}&page_size=15`);
-
-               if (!response.ok) {
-                  throw new Error(`Failed to fetch news for ${section}`);
-               }
-
-               const data = await response.json();
-               articles.push(...data.articles);
+            if (!response.ok) {
+               throw new Error("Failed to fetch news");
             }
 
+            const data = await response.json();
+            const articles = Object.values(data.sections).flat();
+
             setAllArticles(articles);
          } catch (err) {
             setError(err.message);